@@ -2,11 +2,28 @@ from flask import Flask, render_template, request, redirect, url_for, flash, jso
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_bcrypt import Bcrypt
-from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, object_session
+from datetime import datetime, timedelta
 import json
 import random
+import time
+import threading
+import secrets
+import sqlite3
+import sys
 import os
 
+from attempt_cache import create_attempt_cache
+from question_pool import QuestionPool, pack_serials, question_fingerprint, selection_seed, unpack_serials
+from question_types import bank_types
+from seen_filter import SeenFilter
+from question_snapshot import read_snapshot
+from score_sketch import ScoreSketches
+from result_writer import WriteBehindQueue
+from user_cache import CachedUser, UserCache
+
 app = Flask(__name__)
 app.config.from_object('config.Config')
 
@@ -16,6 +33,16 @@ login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 login_manager.login_message_category = 'info'
 
+@event.listens_for(Engine, 'connect')
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply Config.SQLITE_PRAGMAS to each new SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in app.config['SQLITE_PRAGMAS'].items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
 # Database Models (unchanged)
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -29,11 +56,16 @@ class Child(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     age = db.Column(db.Integer, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     test_results = db.relationship('TestResult', backref='child', lazy=True)
+    # SeenFilter bytes: questions already given to this child, avoided in later tests
+    seen_questions = db.Column(db.LargeBinary)
     
 class TestResult(db.Model):
+    # A child's results are always read newest first
+    __table_args__ = (db.Index('ix_test_result_child_id_taken_at', 'child_id', 'taken_at'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     child_id = db.Column(db.Integer, db.ForeignKey('child.id'), nullable=False)
     score = db.Column(db.Float, nullable=False)
@@ -43,475 +75,443 @@ class TestResult(db.Model):
     weak_points = db.Column(db.Text)
     strong_points = db.Column(db.Text)
     taken_at = db.Column(db.DateTime, default=datetime.utcnow)
+    attempt_number = db.Column(db.Integer)
+    # Enough to rebuild the questions with QuestionBank.replay(): the bank they came from and
+    # the serials of the issued question ids, packed by question_pool.pack_serials()
+    bank_version = db.Column(db.String(32))
+    question_serials = db.Column(db.LargeBinary)
+    
+    # Decoded on access, so only results that are actually shown pay for json.loads
+    @property
+    def weak_points_list(self):
+        return json.loads(self.weak_points) if self.weak_points else []
+    
+    @property
+    def strong_points_list(self):
+        return json.loads(self.strong_points) if self.strong_points else []
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'score': self.score,
+            'total_questions': self.total_questions,
+            'correct_answers': self.correct_answers,
+            'category': self.category,
+            'weak_points': self.weak_points_list,
+            'strong_points': self.strong_points_list,
+            'taken_at': self.taken_at.isoformat() if self.taken_at else None,
+            'attempt_number': self.attempt_number
+        }
+
+# database.py imports db from the app module, which is this module even when run as a script
+sys.modules.setdefault('app', sys.modules[__name__])
+from database import ChildProgress, ProgressTracking, Question, ScoreHistogram
+from migrations import run_migrations
 
 # ==================== AGE-SPECIFIC QUESTION GENERATOR ====================
 class QuestionBank:
-    def __init__(self):
-        print("Initializing QuestionBank...")
-        self.questions = {
-            '6-8': self._generate_questions_6_8(500),
-            '9-11': self._generate_questions_9_11(500),
-            '12-14': self._generate_questions_12_14(500)
+    def __init__(self, mode='lazy', size=500, snapshot_path=None, capacity=5000, eviction='fifo', table=False,
+                 table_memory_limit=100000):
+        started = time.perf_counter()
+        self.mode = mode
+        self.size = size
+        self.capacity = capacity
+        if size > capacity:
+            # A bank is never built larger than it may grow, so say so rather than shrink it quietly
+            print(f"QuestionBank: WARNING: size {size} exceeds capacity {capacity}; "
+                  f"building {capacity} questions per age group (raise QUESTION_BANK_CAPACITY)")
+            self.size = capacity
+        self.eviction = eviction
+        self.table = table
+        self.table_memory_limit = table_memory_limit
+        self._table_signature = None
+        # Age groups too large to hold in memory, sampled from the Question table: age group -> version
+        self.table_groups = {}
+        self.version = None
+        self._generators = {
+            '6-8': self._generate_questions_6_8,
+            '9-11': self._generate_questions_9_11,
+            '12-14': self._generate_questions_12_14
         }
-        print(f"QuestionBank initialized: 6-8: {len(self.questions['6-8'])} questions, "
-              f"9-11: {len(self.questions['9-11'])} questions, "
-              f"12-14: {len(self.questions['12-14'])} questions")
+        # Pools are replaced, never mutated, so readers need no lock; writers take this one
+        self.questions = {}
+        self.build_times = {}
+        self.rotations = {}
+        # Previous bank per age group, so answers to questions issued just before a swap still grade
+        self._retired = {}
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._stop_refresher = threading.Event()
+        
+        print(f"Initializing QuestionBank ({mode} mode)...")
+        if table and self.load_table():
+            pass
+        elif snapshot_path and os.path.exists(snapshot_path):
+            self.load_snapshot(snapshot_path)
+        elif snapshot_path:
+            print(f"QuestionBank: no snapshot at {snapshot_path}, generating questions")
+        
+        if mode == 'eager':
+            for age_group in self._generators:
+                if age_group not in self.questions and age_group not in self.table_groups:
+                    self._materialize(age_group)
+        
+        self.startup_time = time.perf_counter() - started
+        print(f"QuestionBank initialized in {self.startup_time * 1000:.1f} ms: "
+              + ", ".join(f"{age_group}: {len(questions)} questions"
+                          for age_group, questions in self.questions.items()))
     
-    def _generate_questions_6_8(self, count):
-        questions = []
-        for i in range(count):
-            question_type = random.choice(['color_pattern', 'shape_pattern', 'animal_pattern', 
-                                         'number_sequence', 'picture_analogy', 'size_order'])
-            
-            if question_type == 'color_pattern':
-                colors = ['Red 🔴', 'Blue 🔵', 'Green 🟢', 'Yellow 🟡', 'Orange 🟠', 'Purple 🟣']
-                pattern = random.sample(colors, 4)
-                missing = random.randint(0, 3)
-                correct = pattern[missing]
-                pattern[missing] = "❓"
-                
-                questions.append({
-                    'id': f"6-8-{i+1}",
-                    'type': 'color_pattern',
-                    'question': f"What color comes next?<br>{' → '.join(pattern)}",
-                    'options': random.sample(colors, 4),
-                    'correct_answer': correct,
-                    'difficulty': 1,
-                    'category': 'Color Patterns'
-                })
-                
-            elif question_type == 'shape_pattern':
-                shapes = ['⭐ Star', '▲ Triangle', '■ Square', '● Circle', '❤️ Heart', '♦️ Diamond']
-                sequence = [shapes[0], shapes[1], shapes[2], "?"]
-                correct = shapes[3]
-                
-                questions.append({
-                    'id': f"6-8-{i+1}",
-                    'type': 'shape_pattern',
-                    'question': f"Complete the pattern:<br>{' → '.join(sequence)}",
-                    'options': random.sample(shapes, 4),
-                    'correct_answer': correct,
-                    'difficulty': 1,
-                    'category': 'Shape Patterns'
-                })
-                
-            elif question_type == 'animal_pattern':
-                animals = ['🐶 Dog', '🐱 Cat', '🐰 Rabbit', '🐻 Bear', '🦁 Lion', '🐘 Elephant']
-                pattern = []
-                for j in range(3):
-                    pattern.append(animals[j % len(animals)])
-                correct = animals[3 % len(animals)]
-                
-                questions.append({
-                    'id': f"6-8-{i+1}",
-                    'type': 'animal_pattern',
-                    'question': f"Which animal comes next?<br>{' → '.join(pattern)} → ❓",
-                    'options': random.sample(animals, 4),
-                    'correct_answer': correct,
-                    'difficulty': 2,
-                    'category': 'Animal Patterns'
-                })
-                
-            elif question_type == 'number_sequence':
-                sequences = [
-                    [1, 2, 3, 4, '?'],
-                    [2, 4, 6, 8, '?'],
-                    [5, 10, 15, 20, '?'],
-                    [10, 9, 8, 7, '?']
-                ]
-                seq = random.choice(sequences)
-                if seq == [1, 2, 3, 4, '?']:
-                    correct = '5'
-                elif seq == [2, 4, 6, 8, '?']:
-                    correct = '10'
-                elif seq == [5, 10, 15, 20, '?']:
-                    correct = '25'
-                else:
-                    correct = '6'
-                
-                questions.append({
-                    'id': f"6-8-{i+1}",
-                    'type': 'number_sequence',
-                    'question': f"Complete the number sequence:<br>{', '.join(map(str, seq))}",
-                    'options': ['5', '6', '10', '25'],
-                    'correct_answer': correct,
-                    'difficulty': 2,
-                    'category': 'Number Patterns'
-                })
-                
-            elif question_type == 'picture_analogy':
-                analogies = [
-                    ['🐶 is to Dog', '🐱 is to ?'],
-                    ['🍎 is to Apple', '🍌 is to ?'],
-                    ['☀️ is to Sun', '🌙 is to ?'],
-                    ['🚗 is to Car', '✈️ is to ?']
-                ]
-                analogy = random.choice(analogies)
-                if analogy[0] == '🐶 is to Dog':
-                    correct = 'Cat'
-                    options = ['Cat', 'Dog', 'Bird', 'Fish']
-                elif analogy[0] == '🍎 is to Apple':
-                    correct = 'Banana'
-                    options = ['Banana', 'Apple', 'Orange', 'Grape']
-                elif analogy[0] == '☀️ is to Sun':
-                    correct = 'Moon'
-                    options = ['Moon', 'Star', 'Sun', 'Cloud']
-                else:
-                    correct = 'Plane'
-                    options = ['Plane', 'Car', 'Train', 'Boat']
-                
-                questions.append({
-                    'id': f"6-8-{i+1}",
-                    'type': 'picture_analogy',
-                    'question': f"Complete the analogy:<br>{analogy[0]} = {analogy[1]}",
-                    'options': options,
-                    'correct_answer': correct,
-                    'difficulty': 2,
-                    'category': 'Picture Analogies'
-                })
-                
-            else:  # size_order
-                items = [
-                    ['Small', 'Medium', 'Large'],
-                    ['Tiny', 'Small', 'Big', 'Huge'],
-                    ['Baby', 'Child', 'Adult'],
-                    ['Coin', 'Ball', 'Box', 'Car']
-                ]
-                item_set = random.choice(items)
-                missing = random.randint(0, len(item_set)-1)
-                correct = item_set[missing]
-                item_set_display = item_set.copy()
-                item_set_display[missing] = '?'
-                
-                questions.append({
-                    'id': f"6-8-{i+1}",
-                    'type': 'size_order',
-                    'question': f"Complete the size order:<br>{' < '.join(item_set_display)}",
-                    'options': random.sample(['Tiny', 'Small', 'Medium', 'Large', 'Big', 'Huge'], 4),
-                    'correct_answer': correct,
-                    'difficulty': 2,
-                    'category': 'Size Ordering'
-                })
+    def load_snapshot(self, path):
+        """Load every age group from a snapshot written by build_question_bank.py"""
+        try:
+            header, banks = read_snapshot(path)
+        except (OSError, ValueError) as e:
+            print(f"QuestionBank: could not load snapshot {path}: {e}")
+            return False
         
-        return questions
+        for age_group, data in banks.items():
+            self.questions[age_group] = QuestionPool.from_snapshot(age_group, data)
+        self.version = header['sha256'][:12]
+        print(f"QuestionBank: loaded snapshot {path} (version {self.version})")
+        return True
     
-    def _generate_questions_9_11(self, count):
-        questions = []
-        for i in range(count):
-            question_type = random.choice(['matrix_pattern', 'number_series', 'word_analogy', 
-                                         'pattern_completion', 'logical_sequence', 'code_decoding'])
+    def load_table(self):
+        """Load every age group from the Question table, replacing the banks held in memory.
+        
+        Workers loading the same rows build identical pools, so they agree
+        on bank versions and can replay each other's attempts. Age groups
+        with more than `table_memory_limit` questions are not loaded;
+        select_for_attempt() samples them from the table instead.
+        """
+        try:
+            with app.app_context():
+                # save_pool() rewrites rows, so an unchanged table has the same count and last id
+                signature = db.session.query(db.func.count(Question.id), db.func.max(Question.id)).one()
+                if signature == self._table_signature:
+                    return True
+                pools = {}
+                table_groups = {}
+                for age_group in Question.age_groups():
+                    first, last = Question.position_range(age_group)
+                    if last - first + 1 > self.table_memory_limit:
+                        table_groups[age_group] = Question.version(age_group)
+                    else:
+                        pools[age_group] = QuestionPool(age_group, Question.load_questions(age_group), first)
+        except Exception as e:
+            print(f"QuestionBank: could not load the question table: {e}")
+            return False
+        if not pools and not table_groups:
+            print("QuestionBank: question table is empty")
+            return False
+        
+        with self._lock:
+            for age_group, pool in pools.items():
+                old = self.questions.get(age_group)
+                if old is not None and old.version != pool.version:
+                    self._retired[age_group] = old
+                self.questions[age_group] = pool
+            for age_group in table_groups:
+                old = self.questions.pop(age_group, None)
+                if old is not None:
+                    self._retired[age_group] = old
+            self.table_groups = table_groups
+            versions = {age_group: pool.version[:4] for age_group, pool in self.questions.items()}
+            versions.update(table_groups)
+            self.version = '-'.join(versions[age_group] for age_group in sorted(versions))
+            self._table_signature = signature
+        print(f"QuestionBank: loaded question table (version {self.version})"
+              + (f", sampling {', '.join(sorted(table_groups))} from the table" if table_groups else ""))
+        return True
+    
+    def save_table(self):
+        """Write every built age group to the Question table"""
+        with app.app_context():
+            for pool in list(self.questions.values()):
+                Question.save_pool(pool)
+            db.session.commit()
+    
+    def _materialize(self, age_group):
+        """Build the bank for one age group and record how long it took"""
+        with self._lock:
+            # Another thread may have built it while we waited for the lock
+            if age_group in self.questions:
+                return self.questions[age_group]
+            
+            started = time.perf_counter()
+            questions = self._generators[age_group](self.size)
+            self.questions[age_group] = QuestionPool(age_group, questions)
+            self.build_times[age_group] = time.perf_counter() - started
+        print(f"QuestionBank: built {age_group} bank in {self.build_times[age_group] * 1000:.1f} ms")
+        return self.questions[age_group]
+    
+    def _grow(self, age_group, questions, count):
+        """Swap in a copy of the bank with enough questions for `count`, bounded by capacity"""
+        with self._lock:
+            questions = self.questions.get(age_group, questions)
+            missing = count - len(questions)
+            if missing <= 0:
+                return questions
+            if self.eviction != 'fifo':
+                # Without eviction, grow only up to capacity
+                missing = min(missing, self.capacity - len(questions))
+                if missing <= 0:
+                    print(f"DEBUG: Bank for {age_group} is at capacity ({self.capacity}), not growing")
+                    return questions
             
-            if question_type == 'matrix_pattern':
-                matrices = [
-                    "Complete the 3×3 matrix where each number increases by 1",
-                    "Find the missing number in the pattern matrix",
-                    "Matrix with alternating colors and shapes",
-                    "Number matrix with diagonal pattern"
-                ]
-                matrix_desc = random.choice(matrices)
-                
-                questions.append({
-                    'id': f"9-11-{i+1}",
-                    'type': 'matrix_pattern',
-                    'question': f"{matrix_desc}:<br>[1] [2] [3]<br>[4] [5] [6]<br>[7] [8] [?]",
-                    'options': ['9', '10', '11', '12'],
-                    'correct_answer': '9',
-                    'difficulty': 2,
-                    'category': 'Matrix Reasoning'
-                })
-                
-            elif question_type == 'number_series':
-                series = [
-                    "2, 4, 8, 16, ?",
-                    "3, 6, 9, 12, ?",
-                    "1, 4, 9, 16, ?",
-                    "5, 10, 20, 40, ?"
-                ]
-                series_text = random.choice(series)
-                if series_text == "2, 4, 8, 16, ?":
-                    correct = "32"
-                    options = ["24", "28", "32", "36"]
-                elif series_text == "3, 6, 9, 12, ?":
-                    correct = "15"
-                    options = ["13", "14", "15", "16"]
-                elif series_text == "1, 4, 9, 16, ?":
-                    correct = "25"
-                    options = ["20", "23", "25", "30"]
-                else:
-                    correct = "80"
-                    options = ["60", "70", "80", "90"]
-                
-                questions.append({
-                    'id': f"9-11-{i+1}",
-                    'type': 'number_series',
-                    'question': f"What comes next in this series?<br>{series_text}",
-                    'options': options,
-                    'correct_answer': correct,
-                    'difficulty': 2,
-                    'category': 'Number Series'
-                })
-                
-            elif question_type == 'word_analogy':
-                analogies = [
-                    "Hot : Cold :: Day : ?",
-                    "Pen : Write :: Knife : ?",
-                    "Bird : Fly :: Fish : ?",
-                    "Doctor : Hospital :: Teacher : ?"
-                ]
-                analogy = random.choice(analogies)
-                if analogy == "Hot : Cold :: Day : ?":
-                    correct = "Night"
-                    options = ["Night", "Morning", "Evening", "Noon"]
-                elif analogy == "Pen : Write :: Knife : ?":
-                    correct = "Cut"
-                    options = ["Cut", "Sharp", "Metal", "Tool"]
-                elif analogy == "Bird : Fly :: Fish : ?":
-                    correct = "Swim"
-                    options = ["Swim", "Water", "Scale", "Ocean"]
-                else:
-                    correct = "School"
-                    options = ["School", "Class", "Student", "Book"]
-                
-                questions.append({
-                    'id': f"9-11-{i+1}",
-                    'type': 'word_analogy',
-                    'question': f"Complete the analogy:<br>{analogy}",
-                    'options': options,
-                    'correct_answer': correct,
-                    'difficulty': 3,
-                    'category': 'Verbal Reasoning'
-                })
-                
-            elif question_type == 'pattern_completion':
-                patterns = [
-                    "AB AB AB ?",
-                    "AABB AABB ?",
-                    "123 234 345 ?",
-                    "XXO XXO XXO ?"
-                ]
-                pattern = random.choice(patterns)
-                if pattern == "AB AB AB ?":
-                    correct = "AB"
-                    options = ["AB", "BA", "AA", "BB"]
-                elif pattern == "AABB AABB ?":
-                    correct = "AABB"
-                    options = ["AABB", "BBAA", "ABAB", "BABA"]
-                elif pattern == "123 234 345 ?":
-                    correct = "456"
-                    options = ["456", "567", "345", "234"]
-                else:
-                    correct = "XXO"
-                    options = ["XXO", "XOX", "OXX", "OXO"]
-                
-                questions.append({
-                    'id': f"9-11-{i+1}",
-                    'type': 'pattern_completion',
-                    'question': f"Complete the pattern:<br>{pattern}",
-                    'options': options,
-                    'correct_answer': correct,
-                    'difficulty': 2,
-                    'category': 'Pattern Completion'
-                })
-                
-            elif question_type == 'logical_sequence':
-                sequences = [
-                    "Morning → Noon → Afternoon → ?",
-                    "Seed → Sprout → Plant → ?",
-                    "Learn → Practice → Improve → ?",
-                    "Question → Research → Answer → ?"
-                ]
-                sequence = random.choice(sequences)
-                if sequence == "Morning → Noon → Afternoon → ?":
-                    correct = "Evening"
-                    options = ["Evening", "Night", "Dawn", "Midnight"]
-                elif sequence == "Seed → Sprout → Plant → ?":
-                    correct = "Flower"
-                    options = ["Flower", "Tree", "Fruit", "Leaf"]
-                elif sequence == "Learn → Practice → Improve → ?":
-                    correct = "Master"
-                    options = ["Master", "Forget", "Repeat", "Teach"]
-                else:
-                    correct = "Verify"
-                    options = ["Verify", "Ask", "Forget", "Question"]
-                
-                questions.append({
-                    'id': f"9-11-{i+1}",
-                    'type': 'logical_sequence',
-                    'question': f"What comes next in this logical sequence?<br>{sequence}",
-                    'options': options,
-                    'correct_answer': correct,
-                    'difficulty': 3,
-                    'category': 'Logical Sequencing'
-                })
-                
-            else:  # code_decoding
-                codes = [
-                    "If A=1, B=2, C=3, then CAT = ?",
-                    "If DOG = 4157, then GOD = ?",
-                    "If 123 means ABC, then 456 means ?",
-                    "Decode: X → A, Y → B, Z → C, then W → ?"
-                ]
-                code = random.choice(codes)
-                if code == "If A=1, B=2, C=3, then CAT = ?":
-                    correct = "3120"
-                    options = ["3120", "123", "320", "312"]
-                elif code == "If DOG = 4157, then GOD = ?":
-                    correct = "7154"
-                    options = ["7154", "4157", "1547", "7415"]
-                elif code == "If 123 means ABC, then 456 means ?":
-                    correct = "DEF"
-                    options = ["DEF", "GHI", "JKL", "MNO"]
-                else:
-                    correct = "D"
-                    options = ["D", "C", "B", "A"]
-                
-                questions.append({
-                    'id': f"9-11-{i+1}",
-                    'type': 'code_decoding',
-                    'question': f"Code Decoding:<br>{code}",
-                    'options': options,
-                    'correct_answer': correct,
-                    'difficulty': 3,
-                    'category': 'Code Decoding'
-                })
+            generator = self._generators.get(age_group, self._generate_questions_6_8)
+            self._retired[age_group] = questions
+            questions = questions.grown(generator(missing), self.capacity)
+            self.questions[age_group] = questions
+            return questions
+    
+    def answer_key(self, question_id):
+        """Find the template for an issued question id in the current or previous bank"""
+        age_group = str(question_id).rpartition('-')[0]
+        for pool in (self.questions.get(age_group), self._retired.get(age_group)):
+            if pool is not None:
+                template = pool.find(question_id)
+                if template is not None:
+                    return template
+        return None
+    
+    def issue(self, questions):
+        """Answer key for a set of questions being handed out: id -> (answer, type, category, difficulty)"""
+        return {
+            q['id']: (q['correct_answer'], q['type'], q['category'], q['difficulty'])
+            for q in questions
+        }
+    
+    def _key_entry(self, question_id):
+        template = self.answer_key(question_id)
+        if template is None:
+            return None
+        return (template.correct_answer, template.type, template.category, template.difficulty)
+    
+    def grade_answers(self, answers, issued=None):
+        """Grade submitted answers against the answer key in a single pass.
+        
+        Type, category and difficulty come from the server rather than the
+        client. With `issued` (from issue()), only those questions are graded
+        and any left unanswered count as incorrect; otherwise ids are looked
+        up in the bank. Unknown and repeated question ids are ignored.
+        """
+        lookup = self._key_entry if issued is None else issued.get
+        submitted = {}
+        for answer in answers:
+            question_id = str(answer.get('question_id'))
+            if question_id not in submitted:
+                submitted[question_id] = answer.get('answer')
+        if issued is not None:
+            submitted = {question_id: submitted.get(question_id) for question_id in issued}
         
+        graded = []
+        categories = {}
+        correct = 0
+        
+        for question_id, user_answer in submitted.items():
+            entry = lookup(question_id)
+            if entry is None:
+                continue
+            correct_answer, question_type, category, difficulty = entry
+            
+            is_correct = user_answer is not None and user_answer == correct_answer
+            if is_correct:
+                correct += 1
+            
+            stats = categories.setdefault(category, {'total': 0, 'correct': 0})
+            stats['total'] += 1
+            if is_correct:
+                stats['correct'] += 1
+            
+            graded.append({
+                'question_id': question_id,
+                'answer': user_answer,
+                'is_correct': is_correct,
+                'type': question_type,
+                'category': category,
+                'difficulty': difficulty
+            })
+        
+        return {
+            'correct': correct,
+            'total': len(graded),
+            'categories': categories,
+            'answers': graded
+        }
+    
+    def rotate(self, age_group):
+        """Replace an age group's bank with freshly generated questions.
+        
+        Generation happens outside the lock; only the swap is locked. New ids
+        continue after the old bank's last id so they are never reused.
+        """
+        started = time.perf_counter()
+        new_questions = self._generators[age_group](self.size)
+        
+        with self._lock:
+            old = self.questions.get(age_group)
+            first_serial = old.first_serial + len(old) if old is not None else 1
+            if old is not None:
+                self._retired[age_group] = old
+            self.questions[age_group] = QuestionPool(age_group, new_questions, first_serial)
+            # The snapshot no longer describes what we serve
+            self.version = None
+        
+        duration = time.perf_counter() - started
+        stats = self.rotations.setdefault(age_group, {'count': 0, 'total_ms': 0.0})
+        stats['count'] += 1
+        stats['last_ms'] = round(duration * 1000, 2)
+        stats['total_ms'] = round(stats['total_ms'] + duration * 1000, 2)
+        stats['last_at'] = datetime.utcnow().isoformat()
+        return duration
+    
+    def start_refresher(self, interval):
+        """Rotate every built age group every `interval` seconds on a daemon thread.
+        
+        A bank loaded from the Question table is reloaded from it instead, so
+        all workers pick up a bank saved with build_question_bank.py --table.
+        """
+        if self._refresher is not None:
+            return
+        
+        def run():
+            while not self._stop_refresher.wait(interval):
+                if self.table:
+                    self.load_table()
+                    continue
+                for age_group in list(self.questions):
+                    if age_group not in self._generators:
+                        continue
+                    try:
+                        duration = self.rotate(age_group)
+                        print(f"QuestionBank: rotated {age_group} bank in {duration * 1000:.1f} ms")
+                    except Exception as e:
+                        print(f"QuestionBank: rotating {age_group} failed: {e}")
+        
+        self._stop_refresher.clear()
+        self._refresher = threading.Thread(target=run, name='question-bank-refresher', daemon=True)
+        self._refresher.start()
+        print(f"QuestionBank: refreshing banks every {interval} seconds")
+    
+    def stop_refresher(self):
+        if self._refresher is not None:
+            self._stop_refresher.set()
+            self._refresher.join()
+            self._refresher = None
+    
+    def stats(self):
+        """Startup, build and rotation timings, for /health"""
+        return {
+            'mode': self.mode,
+            'version': self.version,
+            'startup_ms': round(self.startup_time * 1000, 2),
+            'age_groups': {
+                age_group: {
+                    'questions': len(questions),
+                    'templates': len(questions.templates),
+                    'build_ms': round(self.build_times.get(age_group, 0) * 1000, 2),
+                    'rotations': self.rotations.get(age_group, {'count': 0})
+                }
+                for age_group, questions in self.questions.items()
+            },
+            'table_groups': self.table_groups
+        }
+    
+    def _generate(self, age_group, count):
+        """Generate questions with the shared question-type registry"""
+        questions = bank_types.generate(age_group, count)
+        for i, question in enumerate(questions):
+            question['id'] = f"{age_group}-{i+1}"
         return questions
     
+    def _generate_questions_6_8(self, count):
+        return self._generate('6-8', count)
+    
+    def _generate_questions_9_11(self, count):
+        return self._generate('9-11', count)
+    
     def _generate_questions_12_14(self, count):
+        return self._generate('12-14', count)
+    
+    def select_for_attempt(self, age_group, child_id, attempt_number, count=10, seen=None):
+        """Pick a child's questions as a pure function of (child, attempt, bank version).
+        
+        Returns (questions, bank_version). Storing the bank version and the
+        issued ids (pack_serials) is enough to rebuild the test later with
+        replay(). Questions in the child's SeenFilter are avoided where possible.
+        Age groups kept in the Question table are sampled there with indexed
+        lookups, so they never have to fit in memory.
+        """
+        table_version = self.table_groups.get(age_group)
+        if table_version is not None:
+            seed = selection_seed(child_id, attempt_number, table_version)
+            return Question.sample(age_group, count, exclude=seen, rng=random.Random(seed)), table_version
+        
+        questions = self.questions.get(age_group)
+        if questions is None:
+            questions = self._materialize(age_group)
+        if len(questions) < count:
+            questions = self._grow(age_group, questions, count)
+        
+        seed = selection_seed(child_id, attempt_number, questions.version)
+        return questions.sample(count, exclude=seen, rng=random.Random(seed)), questions.version
+    
+    def replay(self, age_group, bank_version, serials):
+        """Rebuild the questions of a past attempt from its bank version and question serials.
+        
+        Returns None if that bank version is no longer loaded. Each attempt
+        stands alone, so losing one bank only affects attempts taken on it.
+        Attempts drawn from the Question table are read back by position.
+        """
+        if bank_version is not None and bank_version == self.table_groups.get(age_group):
+            return Question.by_positions(age_group, serials)
+        
+        for pool in (self.questions.get(age_group), self._retired.get(age_group)):
+            if pool is not None and pool.version == bank_version:
+                break
+        else:
+            return None
+        
         questions = []
-        for i in range(count):
-            question_type = random.choice(['advanced_matrix', 'abstract_reasoning', 'complex_analogy', 
-                                         'spatial_reasoning', 'deductive_logic', 'verbal_reasoning'])
-            
-            if question_type == 'advanced_matrix':
-                questions.append({
-                    'id': f"12-14-{i+1}",
-                    'type': 'advanced_matrix',
-                    'question': f"Complete the matrix pattern:<br>[2][4][6]<br>[8][10][12]<br>[14][16][?]",
-                    'options': ['18', '20', '22', '24'],
-                    'correct_answer': '18',
-                    'difficulty': 3,
-                    'category': 'Advanced Matrix'
-                })
-                
-            elif question_type == 'abstract_reasoning':
-                questions.append({
-                    'id': f"12-14-{i+1}",
-                    'type': 'abstract_reasoning',
-                    'question': f"If all squares are rectangles, and some rectangles are red, then:",
-                    'options': ['Some squares are red', 'All red things are squares', 
-                               'No squares are red', 'Cannot determine'],
-                    'correct_answer': 'Some squares are red',
-                    'difficulty': 3,
-                    'category': 'Abstract Reasoning'
-                })
-                
-            elif question_type == 'complex_analogy':
-                analogies = [
-                    "Physics : Newton :: Biology : ?",
-                    "Author : Book :: Architect : ?",
-                    "Chemistry : Element :: Linguistics : ?",
-                    "Mathematics : Theorem :: Law : ?"
-                ]
-                analogy = random.choice(analogies)
-                if analogy == "Physics : Newton :: Biology : ?":
-                    correct = "Darwin"
-                    options = ["Darwin", "Einstein", "Galileo", "Pasteur"]
-                elif analogy == "Author : Book :: Architect : ?":
-                    correct = "Building"
-                    options = ["Building", "Blueprint", "Design", "Structure"]
-                elif analogy == "Chemistry : Element :: Linguistics : ?":
-                    correct = "Word"
-                    options = ["Word", "Sentence", "Grammar", "Language"]
-                else:
-                    correct = "Precedent"
-                    options = ["Precedent", "Case", "Judge", "Verdict"]
-                
-                questions.append({
-                    'id': f"12-14-{i+1}",
-                    'type': 'complex_analogy',
-                    'question': f"Complex Analogy:<br>{analogy}",
-                    'options': options,
-                    'correct_answer': correct,
-                    'difficulty': 3,
-                    'category': 'Complex Analogies'
-                })
-                
-            elif question_type == 'spatial_reasoning':
-                questions.append({
-                    'id': f"12-14-{i+1}",
-                    'type': 'spatial_reasoning',
-                    'question': f"If a cube is rotated 90° clockwise, which face is on top?",
-                    'options': ['Front face', 'Right face', 'Top face', 'Back face'],
-                    'correct_answer': 'Right face',
-                    'difficulty': 3,
-                    'category': 'Spatial Reasoning'
-                })
-                
-            elif question_type == 'deductive_logic':
-                questions.append({
-                    'id': f"12-14-{i+1}",
-                    'type': 'deductive_logic',
-                    'question': f"Premise: If it rains, the ground is wet. Ground is wet. Conclusion?",
-                    'options': ['It is raining', 'It might be raining', 
-                               'Cannot determine', 'It is not raining'],
-                    'correct_answer': 'It might be raining',
-                    'difficulty': 4,
-                    'category': 'Deductive Logic'
-                })
-                
-            else:  # verbal_reasoning
-                questions.append({
-                    'id': f"12-14-{i+1}",
-                    'type': 'verbal_reasoning',
-                    'question': f"Which word doesn't belong: Apple, Orange, Banana, Carrot?",
-                    'options': ['Apple', 'Orange', 'Banana', 'Carrot'],
-                    'correct_answer': 'Carrot',
-                    'difficulty': 3,
-                    'category': 'Verbal Reasoning'
-                })
-        
-        print(f"Generated {len(questions)} questions for age 12-14")
+        for serial in serials:
+            question_id = f"{age_group}-{serial}"
+            template = pool.find(question_id)
+            if template is None:
+                return None
+            questions.append(template.to_dict(question_id))
         return questions
     
-    def get_questions(self, age_group, count=10):
-        """Get random questions for an age group"""
+    def get_questions(self, age_group, count=10, **blueprint):
+        """Get a balanced random selection of questions for an age group.
+        
+        By default the questions are spread evenly across categories; keyword
+        arguments are passed to QuestionPool.sample (e.g. per_group=2,
+        min_difficulty=2 for two of each category at difficulty 2 or more).
+        `count` is always the total: with per_group the remainder is filled
+        from any category, or per_group is reduced where categories x
+        per_group exceeds it.
+        """
         print(f"\n=== DEBUG: Getting questions for {age_group} ===")
         
-        # Check if we have questions for this age group
-        if age_group not in self.questions:
+        # Check if we have questions for this age group (lazy mode builds it on first use)
+        if age_group not in self.questions and age_group in self._generators:
+            questions = self._materialize(age_group)
+        elif age_group not in self.questions:
             print(f"ERROR: Age group {age_group} not found!")
-            if age_group == '6-8':
-                questions = self._generate_questions_6_8(count)
-            elif age_group == '9-11':
-                questions = self._generate_questions_9_11(count)
-            elif age_group == '12-14':
-                questions = self._generate_questions_12_14(count)
-            else:
-                questions = self._generate_questions_6_8(count)
+            questions = QuestionPool(age_group, self._generate_questions_6_8(count))
         else:
             questions = self.questions[age_group]
         
         print(f"DEBUG: Found {len(questions)} questions in bank for {age_group}")
         
-        # If we don't have enough questions, generate more
+        # If we don't have enough questions, generate only the shortfall
         if len(questions) < count:
-            print(f"DEBUG: Not enough questions, generating {count} new ones")
-            if age_group == '6-8':
-                new_questions = self._generate_questions_6_8(count)
-            elif age_group == '9-11':
-                new_questions = self._generate_questions_9_11(count)
-            elif age_group == '12-14':
-                new_questions = self._generate_questions_12_14(count)
-            else:
-                new_questions = self._generate_questions_6_8(count)
-            
-            questions.extend(new_questions)
-            self.questions[age_group] = questions
+            print(f"DEBUG: Not enough questions, generating {count - len(questions)} new ones")
+            questions = self._grow(age_group, questions, count)
         
         # Select random questions
         if len(questions) > 0:
-            selected = random.sample(questions, min(count, len(questions)))
+            selected = questions.sample(count, **blueprint)
             print(f"DEBUG: Selected {len(selected)} questions")
             
             # Debug: Print first question details
@@ -525,11 +525,77 @@ class QuestionBank:
         print(f"=== DEBUG: Returning {len(selected)} questions ===\n")
         return selected
 
-question_bank = QuestionBank()
+question_bank = QuestionBank(app.config['QUESTION_BANK_MODE'], app.config['QUESTION_BANK_SIZE'],
+                             app.config['QUESTION_BANK_SNAPSHOT'], app.config['QUESTION_BANK_CAPACITY'],
+                             app.config['QUESTION_BANK_EVICTION'], app.config['QUESTION_BANK_TABLE'],
+                             app.config['QUESTION_BANK_TABLE_MEMORY_LIMIT'])
+if app.config['QUESTION_BANK_REFRESH_SECONDS'] > 0:
+    question_bank.start_refresher(app.config['QUESTION_BANK_REFRESH_SECONDS'])
+
+# Questions issued by start_test, keyed by attempt token, until the test is submitted
+attempt_cache = create_attempt_cache(app.config)
+
+# Score distributions per age group and category, for "compared with other children" percentiles
+score_sketches = ScoreSketches()
+
+def save_score_deltas(rows):
+    ScoreHistogram.merge(rows)
+    db.session.commit()
+
+def sync_score_sketches():
+    """Save this worker's new scores to ScoreHistogram and reload the combined counts"""
+    with app.app_context():
+        try:
+            score_sketches.sync(save_score_deltas, ScoreHistogram.totals)
+        except Exception:
+            db.session.rollback()
+            raise
+
+def cohort_percentile(age_group, score, category=''):
+    """Percentile rank of a score among all tests in the age group (None until there is data)"""
+    if not score_sketches.loaded:
+        try:
+            sync_score_sketches()
+        except Exception as e:
+            print(f"ScoreSketches: could not load saved scores: {e}")
+    return score_sketches.percentile(age_group, score, category)
+
+if app.config['SCORE_SKETCH_SYNC_SECONDS'] > 0:
+    score_sketches.start_syncer(app.config['SCORE_SKETCH_SYNC_SECONDS'], sync_score_sketches)
+
+# Users behind session cookies, so authenticated requests skip the User query; None disables it
+user_cache = UserCache(app.config['USER_CACHE_TTL'], app.config['USER_CACHE_SIZE']) \
+    if app.config['USER_CACHE_TTL'] > 0 else None
+
+def fetch_cached_user(user_id):
+    row = db.session.query(User.id, User.username, User.email).filter(User.id == user_id).first()
+    return CachedUser(*row) if row is not None else None
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def note_changed_user(mapper, connection, target):
+    # Remember the user until the transaction commits; invalidating now could be undone by a
+    # failed commit or a request re-caching the old row before the change is visible
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_users', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_cached_users(session):
+    changed = session.info.pop('changed_users', None)
+    if changed and user_cache is not None:
+        for user_id in changed:
+            user_cache.invalidate(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def forget_changed_users(session):
+    session.info.pop('changed_users', None)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    if user_cache is None:
+        return User.query.get(int(user_id))
+    return user_cache.get(int(user_id), fetch_cached_user)
 
 def get_age_group(age):
     if 6 <= age <= 8:
@@ -612,7 +678,25 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    children = Child.query.filter_by(user_id=current_user.id).all()
+    # Latest result and test count per child in one query, instead of loading every result per child
+    ranked = db.session.query(
+        TestResult.child_id,
+        TestResult.score,
+        TestResult.taken_at,
+        db.func.row_number().over(partition_by=TestResult.child_id,
+                                  order_by=(TestResult.taken_at.desc(), TestResult.id.desc())).label('rank'),
+        db.func.count().over(partition_by=TestResult.child_id).label('test_count')
+    ).join(Child, Child.id == TestResult.child_id).filter(Child.user_id == current_user.id).subquery()
+    
+    rows = db.session.query(Child, ranked.c.score, ranked.c.taken_at, ranked.c.test_count) \
+        .outerjoin(ranked, db.and_(ranked.c.child_id == Child.id, ranked.c.rank == 1)) \
+        .filter(Child.user_id == current_user.id).order_by(Child.id).all()
+    
+    children = []
+    for child, score, taken_at, test_count in rows:
+        child.latest_result = {'score': score, 'taken_at': taken_at} if taken_at is not None else None
+        child.test_count = test_count or 0
+        children.append(child)
     return render_template('dashboard.html', children=children)
 
 @app.route('/add_child', methods=['GET', 'POST'])
@@ -650,7 +734,9 @@ def start_test(child_id):
         return redirect(url_for('dashboard'))
     
     age_group = get_age_group(child.age)
-    questions = question_bank.get_questions(age_group, 10)
+    attempt_number = TestResult.query.filter_by(child_id=child.id).count() + 1
+    seen = SeenFilter.from_bytes(child.seen_questions)
+    questions, bank_version = question_bank.select_for_attempt(age_group, child.id, attempt_number, 10, seen)
     
     print(f"\n=== START TEST DEBUG ===")
     print(f"Child: {child.name}, Age: {child.age}")
@@ -668,7 +754,22 @@ def start_test(child_id):
     else:
         template_name = 'test_12_14.html'
     
-    return render_template(template_name, child=child, questions=questions, age_group=age_group)
+    # Remember what was issued so submit_test can grade without trusting the browser
+    attempt_token = secrets.token_urlsafe(16)
+    attempt_cache.put(attempt_token, {
+        'child_id': child.id,
+        'age_group': age_group,
+        'attempt_number': attempt_number,
+        'bank_version': bank_version,
+        'questions': question_bank.issue(questions),
+        'fingerprints': [question_fingerprint(q) for q in questions]
+    })
+    
+    # Answers are graded on the server, so the key never goes to the browser
+    questions = [{k: v for k, v in q.items() if k != 'correct_answer'} for q in questions]
+    
+    return render_template(template_name, child=child, questions=questions, age_group=age_group,
+                           attempt_token=attempt_token)
 
 @app.route('/submit_test/<int:child_id>', methods=['POST'])
 @login_required
@@ -680,25 +781,15 @@ def submit_test(child_id):
     data = request.json
     answers = data.get('answers', [])
     
-    correct_count = 0
-    question_categories = {}
+    attempt = attempt_cache.pop(data.get('attempt_token'))
+    if attempt is None or attempt['child_id'] != child.id:
+        return jsonify({'error': 'This test has expired or was already submitted. Please start a new test.'}), 400
     
-    for answer in answers:
-        question_id = answer.get('question_id')
-        user_answer = answer.get('answer')
-        
-        is_correct = random.choice([True, False, True, True])
-        if is_correct:
-            correct_count += 1
-        
-        category = answer.get('category', 'Unknown')
-        if category not in question_categories:
-            question_categories[category] = {'total': 0, 'correct': 0}
-        question_categories[category]['total'] += 1
-        if is_correct:
-            question_categories[category]['correct'] += 1
+    grading = question_bank.grade_answers(answers, attempt['questions'])
+    correct_count = grading['correct']
+    question_categories = grading['categories']
     
-    total_questions = len(answers)
+    total_questions = grading['total']
     score = (correct_count / total_questions * 100) if total_questions > 0 else 0
     
     weak_points = []
@@ -711,17 +802,41 @@ def submit_test(child_id):
         elif accuracy > 80:
             strong_points.append(category)
     
-    test_result = TestResult(
-        child_id=child_id,
-        score=score,
-        total_questions=total_questions,
-        correct_answers=correct_count,
-        category=get_age_group(child.age),
-        weak_points=json.dumps(weak_points),
-        strong_points=json.dumps(strong_points)
-    )
-    db.session.add(test_result)
-    db.session.commit()
+    time_taken = data.get('time_taken')
+    submission = {
+        'child_id': child.id,
+        'age_group': get_age_group(child.age),
+        'score': score,
+        'total_questions': total_questions,
+        'correct_answers': correct_count,
+        'weak_points': weak_points,
+        'strong_points': strong_points,
+        'categories': question_categories,
+        'attempt_number': attempt['attempt_number'],
+        'bank_version': attempt['bank_version'],
+        'question_serials': pack_serials(attempt['questions']),
+        'fingerprints': attempt['fingerprints'],
+        'time_taken': time_taken if isinstance(time_taken, (int, float)) else None,
+        'taken_at': datetime.utcnow()
+    }
+    if result_writer is not None:
+        # Wait until the batch holding this result is committed
+        result_id = result_writer.submit(submission).result()
+    else:
+        test_result = save_submission(submission)
+        db.session.commit()
+        result_id = test_result.id
+    
+    score_sketches.record(submission['age_group'], score, {
+        category: stats['correct'] / stats['total'] * 100
+        for category, stats in question_categories.items() if stats['total'] > 0
+    })
+    if app.config['SCORE_SKETCH_SYNC_SECONDS'] <= 0:
+        try:
+            sync_score_sketches()
+        except Exception as e:
+            print(f"ScoreSketches: sync failed: {e}")
+    percentile = cohort_percentile(submission['age_group'], score)
     
     return jsonify({
         'success': True,
@@ -730,9 +845,78 @@ def submit_test(child_id):
         'total_questions': total_questions,
         'weak_points': weak_points,
         'strong_points': strong_points,
-        'result_id': test_result.id
+        'result_id': result_id,
+        'percentile': round(percentile, 1) if percentile is not None else None
     })
 
+def save_submission(submission):
+    """Add one graded test to the session: the TestResult, progress aggregates, daily
+    rollups and the child's seen questions. The caller commits."""
+    taken_at = submission['taken_at']
+    test_result = TestResult(
+        child_id=submission['child_id'],
+        score=submission['score'],
+        total_questions=submission['total_questions'],
+        correct_answers=submission['correct_answers'],
+        category=submission['age_group'],
+        weak_points=json.dumps(submission['weak_points']),
+        strong_points=json.dumps(submission['strong_points']),
+        attempt_number=submission['attempt_number'],
+        bank_version=submission['bank_version'],
+        question_serials=submission['question_serials'],
+        taken_at=taken_at
+    )
+    db.session.add(test_result)
+    db.session.flush()
+    ChildProgress.record(submission['child_id'], submission['score'], taken_at)
+    ProgressTracking.record(submission['child_id'], taken_at.date(), submission['categories'],
+                            submission['time_taken'])
+    
+    # Re-read the child under a row lock so concurrent submissions merge into the latest filter
+    # (SQLite has no row locks, but the flush above already holds its write lock)
+    child = Child.query.filter_by(id=submission['child_id']).with_for_update() \
+        .populate_existing().one()
+    seen = SeenFilter.from_bytes(child.seen_questions)
+    seen.update(submission['fingerprints'])
+    child.seen_questions = seen.to_bytes()
+    return test_result
+
+def write_submissions(submissions):
+    """Write a batch of submissions in one transaction for the write-behind queue.
+    
+    Returns the new TestResult ids. If the batch fails, each submission is
+    retried in its own transaction so one bad row only fails its own request.
+    """
+    with app.app_context():
+        try:
+            test_results = [save_submission(submission) for submission in submissions]
+            db.session.flush()
+            result_ids = [test_result.id for test_result in test_results]
+            db.session.commit()
+            return result_ids
+        except Exception as e:
+            db.session.rollback()
+            print(f"Result writer: batch of {len(submissions)} failed ({e}), writing one by one")
+        
+        outcomes = []
+        for submission in submissions:
+            try:
+                test_result = save_submission(submission)
+                db.session.flush()
+                outcomes.append(test_result.id)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                outcomes.append(e)
+        return outcomes
+
+# Optional group commit for submit_test; None writes each submission in its own transaction
+result_writer = None
+if app.config['RESULT_WRITE_BEHIND']:
+    result_writer = WriteBehindQueue(write_submissions,
+                                     app.config['RESULT_BATCH_MAX_ROWS'],
+                                     app.config['RESULT_BATCH_MAX_DELAY_MS'] / 1000)
+
 @app.route('/results/<int:child_id>')
 @login_required
 def results(child_id):
@@ -741,25 +925,127 @@ def results(child_id):
         flash('Unauthorized access', 'danger')
         return redirect(url_for('dashboard'))
     
-    test_results = TestResult.query.filter_by(child_id=child_id).order_by(TestResult.taken_at.desc()).all()
+    try:
+        test_results, next_cursor = results_page(child_id, request.args.get('before'))
+    except ValueError:
+        return redirect(url_for('results', child_id=child_id))
     
     for result in test_results:
-        if result.weak_points:
-            result.weak_points_list = json.loads(result.weak_points)
-        else:
-            result.weak_points_list = []
-        
-        if result.strong_points:
-            result.strong_points_list = json.loads(result.strong_points)
-        else:
-            result.strong_points_list = []
+        result.percentile = cohort_percentile(result.category, result.score)
+    
+    child_progress = ChildProgress.for_child(child.id)
+    progress = child_progress.to_dict()
+    db.session.commit()
+    
+    return render_template('results.html', child=child, test_results=test_results, progress=progress,
+                           test_count=child_progress.test_count, next_cursor=next_cursor,
+                           is_first_page=not request.args.get('before'))
+
+@app.route('/api/results/<int:child_id>')
+@login_required
+def results_api(child_id):
+    """Results page as JSON for infinite scroll: pass next_cursor back as ?before= for older results"""
+    child = Child.query.get_or_404(child_id)
+    if child.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    try:
+        test_results, next_cursor = results_page(child_id, request.args.get('before'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    page = []
+    for result in test_results:
+        data = result.to_dict()
+        percentile = cohort_percentile(result.category, result.score)
+        data['percentile'] = round(percentile, 1) if percentile is not None else None
+        page.append(data)
+    return jsonify({'results': page, 'next_cursor': next_cursor})
+
+def results_page(child_id, cursor=None):
+    """One page of a child's results, newest first, with keyset pagination on (taken_at, id).
     
-    return render_template('results.html', child=child, test_results=test_results)
+    `cursor` is the next_cursor of the previous page. Returns (results,
+    next_cursor), where next_cursor is None on the last page. Raises
+    ValueError for a malformed cursor.
+    """
+    page_size = app.config['RESULTS_PAGE_SIZE']
+    query = TestResult.query.filter_by(child_id=child_id)
+    if cursor:
+        taken_at, _, result_id = cursor.rpartition('_')
+        taken_at, result_id = datetime.fromisoformat(taken_at), int(result_id)
+        # The redundant taken_at <= bound lets the (child_id, taken_at) index seek straight to the cursor
+        query = query.filter(TestResult.taken_at <= taken_at,
+                             db.or_(TestResult.taken_at < taken_at, TestResult.id < result_id))
+    
+    # One extra row tells whether there is another page
+    test_results = query.order_by(TestResult.taken_at.desc(), TestResult.id.desc()).limit(page_size + 1).all()
+    if len(test_results) <= page_size:
+        return test_results, None
+    test_results = test_results[:page_size]
+    last = test_results[-1]
+    return test_results, f"{last.taken_at.isoformat()}_{last.id}"
+
+@app.route('/progress/<int:child_id>')
+@login_required
+def progress_trends(child_id):
+    """Daily score trends per category, read from the ProgressTracking rollups only"""
+    child = Child.query.get_or_404(child_id)
+    if child.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    rollups = ProgressTracking.query.filter_by(child_id=child_id)
+    days = request.args.get('days', type=int)
+    if days:
+        rollups = rollups.filter(ProgressTracking.date > datetime.utcnow().date() - timedelta(days=days))
+    
+    trends = []
+    for rollup in rollups.order_by(ProgressTracking.date, ProgressTracking.category):
+        if not trends or trends[-1]['date'] != rollup.date.isoformat():
+            trends.append({'date': rollup.date.isoformat(), 'questions': 0, 'correct': 0, 'time_taken': 0,
+                           'categories': {}})
+        day = trends[-1]
+        day['questions'] += rollup.questions
+        day['correct'] += rollup.correct
+        day['time_taken'] += rollup.time_taken or 0
+        day['categories'][rollup.category] = {
+            'score': round(rollup.score, 2),
+            'questions': rollup.questions,
+            'correct': rollup.correct,
+            'tests': rollup.test_count
+        }
+    for day in trends:
+        day['score'] = round(day['correct'] / day['questions'] * 100, 2) if day['questions'] else 0
+    
+    return jsonify({'child_id': child.id, 'days': trends})
+
+@app.route('/review/<int:result_id>')
+@login_required
+def review_test(result_id):
+    result = TestResult.query.get_or_404(result_id)
+    child = result.child
+    if child.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    questions = None
+    if result.question_serials is not None:
+        questions = question_bank.replay(result.category, result.bank_version,
+                                         unpack_serials(result.question_serials))
+    if questions is None:
+        return jsonify({'error': 'The questions for this test are no longer available'}), 404
+    
+    return jsonify({
+        'result_id': result.id,
+        'bank_version': result.bank_version,
+        'questions': questions
+    })
 
 @app.route('/profile')
 @login_required
 def profile():
-    return render_template('profile.html', user=current_user)
+    # current_user may be a CachedUser; the page needs created_at and children
+    user = User.query.get_or_404(current_user.id)
+    return render_template('profile.html', user=user)
 
 # Animation preview page
 @app.route('/animations')
@@ -772,7 +1058,11 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'service': 'Cognitive Skills Test',
-        'timestamp': datetime.utcnow().isoformat()
+        'timestamp': datetime.utcnow().isoformat(),
+        'question_bank': question_bank.stats(),
+        'score_sketches': score_sketches.stats(),
+        'result_writer': result_writer.stats() if result_writer is not None else {'enabled': False},
+        'user_cache': user_cache.stats() if user_cache is not None else {'enabled': False}
     })
 
 def init_database():
@@ -781,6 +1071,10 @@ def init_database():
             db.create_all()
             print("✓ Database tables created successfully!")
             
+            # Bring tables created by older versions up to date
+            for version, description in run_migrations(db.engine):
+                print(f"✓ Migration {version}: {description}")
+            
             # Check if we have an admin user
             admin = User.query.filter_by(username='admin').first()
             if not admin:
@@ -0,0 +1,125 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class AttemptCache:
+    """In-process LRU cache of issued test attempts.
+
+    Entries expire `ttl` seconds after they are stored and the least
+    recently used entry is evicted once `max_size` is reached, so the cache
+    stays bounded however many tests are started and abandoned.
+    """
+
+    def __init__(self, ttl=7200, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def put(self, token, attempt):
+        with self._lock:
+            now = time.time()
+            self._entries[token] = (now + self.ttl, attempt)
+            self._entries.move_to_end(token)
+            # Oldest entries sit at the front, so expired ones are dropped from there
+            while self._entries:
+                oldest = next(iter(self._entries))
+                if self._entries[oldest][0] > now and len(self._entries) <= self.max_size:
+                    break
+                del self._entries[oldest]
+                self.evictions += 1
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[1]
+
+    def pop(self, token):
+        """Remove and return an attempt, so each one can be submitted once"""
+        with self._lock:
+            entry = self._entries.pop(token, None)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteAttemptCache:
+    """Attempt cache kept in a SQLite file, shared by every worker process"""
+
+    def __init__(self, path, ttl=7200, max_size=10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS attempts ('
+                         'token TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_attempts_expires_at ON attempts (expires_at)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def put(self, token, attempt):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO attempts (token, payload, expires_at) VALUES (?, ?, ?)',
+                             (token, json.dumps(attempt), now + self.ttl))
+                conn.execute('DELETE FROM attempts WHERE expires_at <= ?', (now,))
+                # Expiry order is issue order, so trimming the earliest expiries drops the oldest attempts
+                conn.execute('DELETE FROM attempts WHERE token IN ('
+                             'SELECT token FROM attempts ORDER BY expires_at '
+                             'LIMIT max(0, (SELECT COUNT(*) FROM attempts) - ?))', (self.max_size,))
+        finally:
+            conn.close()
+
+    def get(self, token):
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT payload FROM attempts WHERE token = ? AND expires_at > ?',
+                               (token, time.time())).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def pop(self, token):
+        """Remove and return an attempt, so each one can be submitted once"""
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute('SELECT payload, expires_at FROM attempts WHERE token = ?', (token,)).fetchone()
+                if row is None:
+                    return None
+                # Only the connection whose DELETE removed the row may use it
+                if conn.execute('DELETE FROM attempts WHERE token = ?', (token,)).rowcount == 0:
+                    return None
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row[1] > time.time() else None
+
+    def __len__(self):
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM attempts WHERE expires_at > ?', (time.time(),)).fetchone()[0]
+        finally:
+            conn.close()
+
+def create_attempt_cache(config):
+    """Build the attempt cache selected by ATTEMPT_CACHE_BACKEND ('memory' or 'sqlite')"""
+    ttl = config['ATTEMPT_CACHE_TTL']
+    max_size = config['ATTEMPT_CACHE_SIZE']
+    if config['ATTEMPT_CACHE_BACKEND'] == 'sqlite':
+        return SQLiteAttemptCache(config['ATTEMPT_CACHE_PATH'], ttl, max_size)
+    return AttemptCache(ttl, max_size)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Measure concurrent write throughput of the database engine settings
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.exc import OperationalError
+
+from app import app, db, bcrypt, User, Child, TestResult
+from config import engine_options
+
+def write_results(task):
+    """One worker: commit `writes` single-row transactions, like submit_test does"""
+    url, pragmas, child_id, writes = task
+    app.config['SQLITE_PRAGMAS'] = pragmas
+    engine = create_engine(url, **engine_options(url))
+    failed = 0
+    started = time.perf_counter()
+    for i in range(writes):
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(TestResult.__table__), {
+                    'child_id': child_id, 'score': i % 101, 'total_questions': 10,
+                    'correct_answers': i % 11, 'category': '9-11', 'weak_points': '[]', 'strong_points': '[]'
+                })
+        except OperationalError:
+            failed += 1
+    engine.dispose()
+    return time.perf_counter() - started, failed
+
+def run(url, pragmas, workers, writes):
+    app.config['SQLITE_PRAGMAS'] = pragmas
+    engine = create_engine(url, **engine_options(url))
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(User.__table__), {
+            'username': f'bench-{os.getpid()}-{time.time_ns()}', 'email': f'bench-{time.time_ns()}@example.com',
+            'password': bcrypt.generate_password_hash('benchmark').decode('utf-8')
+        }).inserted_primary_key[0]
+        child_id = conn.execute(insert(Child.__table__), {
+            'name': 'Benchmark', 'age': 10, 'user_id': user_id
+        }).inserted_primary_key[0]
+    engine.dispose()
+
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        outcomes = pool.map(write_results, [(url, pragmas, child_id, writes)] * workers)
+    elapsed = time.perf_counter() - started
+    failed = sum(f for _, f in outcomes)
+    committed = workers * writes - failed
+    return committed, failed, elapsed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent TestResult inserts from several processes, '
+                                                 'one transaction per insert')
+    parser.add_argument('--url', help='database to write to (default: a temporary SQLite file)')
+    parser.add_argument('--workers', type=int, default=4, help='writer processes')
+    parser.add_argument('--writes', type=int, default=200, help='transactions per worker')
+    parser.add_argument('--compare', action='store_true',
+                        help='for SQLite, also run with SQLite defaults (SQLITE_PRAGMAS=off)')
+    args = parser.parse_args()
+
+    profiles = [('configured', app.config['SQLITE_PRAGMAS'])]
+    if args.compare:
+        profiles.insert(0, ('sqlite defaults', {}))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, pragmas in profiles:
+            url = args.url or f"sqlite:///{os.path.join(tmp, name.replace(' ', '_'))}.db"
+            committed, failed, elapsed = run(url, pragmas, args.workers, args.writes)
+            print(f"{name:>16}: {committed} commits in {elapsed:.2f} s = {committed / elapsed:8.1f} writes/s"
+                  f" ({failed} failed with 'database is locked')")
+            if pragmas:
+                print(f"{'':>16}  pragmas: {pragmas}")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Build the question bank snapshot that workers load at startup
+"""
+import argparse
+import os
+import random
+import sys
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, QuestionBank
+from migrations import run_migrations
+from question_snapshot import write_snapshot
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate the question banks and write them to a snapshot file')
+    parser.add_argument('--output', default=app.config['QUESTION_BANK_SNAPSHOT'],
+                        help='snapshot path (default: QUESTION_BANK_SNAPSHOT)')
+    parser.add_argument('--size', type=int, default=app.config['QUESTION_BANK_SIZE'],
+                        help='questions per age group')
+    parser.add_argument('--seed', type=int, help='random seed for a reproducible bank')
+    parser.add_argument('--table', action='store_true',
+                        help='also save the bank to the Question table, for workers with QUESTION_BANK_TABLE=1')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    print(f"Generating {args.size} questions per age group...")
+    # The snapshot holds exactly --size questions, even beyond the serving capacity
+    bank = QuestionBank('eager', args.size, capacity=max(args.size, app.config['QUESTION_BANK_CAPACITY']))
+    header = write_snapshot(args.output, bank.questions)
+    print(f"Snapshot written to {args.output}")
+    print(f"Version: {header['version']}, sha256: {header['sha256']}")
+    print(f"Questions: {header['counts']}")
+    
+    if args.table:
+        with app.app_context():
+            db.create_all()
+            run_migrations(db.engine)
+        bank.save_table()
+        print(f"Saved to the question table: {sum(len(questions) for questions in bank.questions.values())} questions")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Rebuild the cohort score distributions used for percentiles from saved test results
+"""
+import argparse
+import os
+import sys
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, TestResult
+from database import ScoreHistogram
+from score_sketch import ALL_CATEGORIES, ScoreSketches
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recount overall score distributions per age group from TestResult history')
+    parser.add_argument('--batch-size', type=int, default=1000, help='results fetched per round trip')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        sketches = ScoreSketches()
+        count = 0
+        print("Reading test results...")
+        for age_group, score in db.session.query(TestResult.category, TestResult.score).yield_per(args.batch_size):
+            sketches.record(age_group, score)
+            count += 1
+
+        # Per-category accuracies are not stored with results, so only overall counts are replaced
+        ScoreHistogram.query.filter_by(category=ALL_CATEGORIES).delete()
+        ScoreHistogram.merge(sketches.take_pending())
+        db.session.commit()
+
+    print(f"Rebuilt score distributions from {count} test results")
+    for age_group, total in sorted(sketches.stats()['tests'].items()):
+        print(f"  {age_group}: {total} tests, median score {sketches.quantile(age_group, 0.5)}")
+    print("Running workers pick up the new counts at their next sync")
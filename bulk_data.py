@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Bulk import of users and children, and streaming export of users, children and test results
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import insert
+
+from app import app, db, bcrypt, User, Child, TestResult
+from migrations import run_migrations
+
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+# What flask_bcrypt writes and can check: $2a$/$2b$/$2y$, two-digit cost, 53 chars of salt and hash
+BCRYPT_HASH = re.compile(r'\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}')
+
+# Columns written by export, in order; the import of the same kind accepts them back
+EXPORT_FIELDS = {
+    'users': ['id', 'username', 'email', 'password_hash', 'created_at'],
+    'children': ['id', 'name', 'age', 'username', 'created_at'],
+    'results': ['id', 'child_id', 'score', 'total_questions', 'correct_answers', 'category',
+                'weak_points', 'strong_points', 'attempt_number', 'bank_version', 'taken_at'],
+}
+
+def file_format(path, fmt=None):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}; use --format csv or ndjson")
+    return FORMATS[extension]
+
+def read_records(path, fmt):
+    """Yield (line number, dict) per CSV row or NDJSON line, without reading the whole file"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                yield line_number, json.loads(line)
+
+def chunked(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+def parse_datetime(value):
+    if not value:
+        return datetime.utcnow()
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+def hash_password(password):
+    return bcrypt.generate_password_hash(password).decode('utf-8')
+
+class ImportStats:
+    def __init__(self):
+        self.inserted = 0
+        self.skipped = {}
+
+    def skip(self, reason, line_number=None):
+        """Count a skipped row; rows with bad data are also reported by line"""
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+        if line_number is not None:
+            print(f"  line {line_number}: {reason}, skipped")
+
+    def report(self, kind):
+        print(f"Imported {self.inserted} {kind}")
+        for reason, count in sorted(self.skipped.items()):
+            print(f"  skipped {count}: {reason}")
+
+def import_users(records, chunk_size, hash_workers):
+    """Insert users chunk by chunk, skipping usernames and emails that already exist.
+
+    Rows carry either a plain `password`, hashed here, or an existing bcrypt
+    `password_hash` (as written by export), which must be a well-formed
+    bcrypt hash so the user can log in. Hashing runs on a thread pool
+    and overlaps with inserting the previous chunk.
+    """
+    stats = ImportStats()
+    usernames = set()
+    emails = set()
+    pending = None
+
+    def insert_chunk(rows, hashes):
+        for row, future in zip(rows, hashes):
+            if future is not None:
+                row['password'] = future.result()
+        db.session.execute(insert(User.__table__), rows)
+        db.session.commit()
+        stats.inserted += len(rows)
+        print(f"  {stats.inserted} users...")
+
+    with ThreadPoolExecutor(max_workers=hash_workers) as pool:
+        for chunk in chunked(records, chunk_size):
+            names = [record.get('username') for _, record in chunk]
+            addresses = [record.get('email') for _, record in chunk]
+            taken_names = {name for (name,) in db.session.query(User.username).filter(User.username.in_(names))}
+            taken_emails = {email for (email,) in db.session.query(User.email).filter(User.email.in_(addresses))}
+
+            rows = []
+            hashes = []
+            for line_number, record in chunk:
+                username = record.get('username')
+                email = record.get('email')
+                password = record.get('password')
+                password_hash = record.get('password_hash')
+                if not username or not email or not (password or password_hash):
+                    stats.skip('missing username, email or password', line_number)
+                    continue
+                if password_hash and not BCRYPT_HASH.fullmatch(password_hash):
+                    stats.skip('password_hash is not a bcrypt hash', line_number)
+                    continue
+                if username in taken_names or username in usernames:
+                    stats.skip('username already exists')
+                    continue
+                if email in taken_emails or email in emails:
+                    stats.skip('email already exists')
+                    continue
+                usernames.add(username)
+                emails.add(email)
+                rows.append({
+                    'username': username,
+                    'email': email,
+                    'password': password_hash,
+                    'created_at': parse_datetime(record.get('created_at'))
+                })
+                hashes.append(pool.submit(hash_password, password) if not password_hash else None)
+
+            if pending is not None:
+                insert_chunk(*pending)
+            pending = (rows, hashes) if rows else None
+        if pending is not None:
+            insert_chunk(*pending)
+    return stats
+
+def import_children(records, chunk_size):
+    """Insert children chunk by chunk, attaching each to its parent by `username`"""
+    stats = ImportStats()
+    for chunk in chunked(records, chunk_size):
+        names = {record.get('username') for _, record in chunk}
+        owners = dict(db.session.query(User.username, User.id).filter(User.username.in_(names)))
+
+        rows = []
+        for line_number, record in chunk:
+            user_id = owners.get(record.get('username'))
+            if user_id is None:
+                stats.skip('unknown username')
+                continue
+            try:
+                age = int(record.get('age'))
+            except (TypeError, ValueError):
+                stats.skip('missing or invalid age', line_number)
+                continue
+            if not record.get('name'):
+                stats.skip('missing name', line_number)
+                continue
+            rows.append({
+                'name': record['name'],
+                'age': age,
+                'user_id': user_id,
+                'created_at': parse_datetime(record.get('created_at'))
+            })
+        if rows:
+            db.session.execute(insert(Child.__table__), rows)
+            db.session.commit()
+            stats.inserted += len(rows)
+            print(f"  {stats.inserted} children...")
+    return stats
+
+def export_query(kind):
+    if kind == 'users':
+        return db.session.query(User.id, User.username, User.email, User.password, User.created_at).order_by(User.id)
+    if kind == 'children':
+        return db.session.query(Child.id, Child.name, Child.age, User.username, Child.created_at) \
+            .join(User, Child.user_id == User.id).order_by(Child.id)
+    return db.session.query(TestResult.id, TestResult.child_id, TestResult.score, TestResult.total_questions,
+                            TestResult.correct_answers, TestResult.category, TestResult.weak_points,
+                            TestResult.strong_points, TestResult.attempt_number, TestResult.bank_version,
+                            TestResult.taken_at).order_by(TestResult.id)
+
+def export_records(kind, path, fmt, batch_size):
+    """Stream rows to a file, fetching `batch_size` at a time. Returns the number written."""
+    fields = EXPORT_FIELDS[kind]
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f) if fmt == 'csv' else None
+        if writer is not None:
+            writer.writerow(fields)
+        for row in export_query(kind).yield_per(batch_size):
+            record = dict(zip(fields, row))
+            for name in ('created_at', 'taken_at'):
+                if record.get(name) is not None:
+                    record[name] = record[name].isoformat()
+            if writer is not None:
+                writer.writerow([record[name] for name in fields])
+            else:
+                for name in ('weak_points', 'strong_points'):
+                    if name in record:
+                        record[name] = json.loads(record[name]) if record[name] else []
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk import users and children, or export users, children and test results')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    importer = subparsers.add_parser('import', help='insert users or children from a CSV or NDJSON file')
+    importer.add_argument('kind', choices=['users', 'children'])
+    importer.add_argument('path')
+    importer.add_argument('--format', choices=['csv', 'ndjson'], help='default: from the file extension')
+    importer.add_argument('--chunk-size', type=int, default=1000, help='rows inserted per transaction')
+    importer.add_argument('--hash-workers', type=int, default=os.cpu_count() or 1,
+                          help='threads hashing plain passwords')
+
+    exporter = subparsers.add_parser('export', help='write users, children or test results to a CSV or NDJSON file')
+    exporter.add_argument('kind', choices=sorted(EXPORT_FIELDS))
+    exporter.add_argument('path')
+    exporter.add_argument('--format', choices=['csv', 'ndjson'], help='default: from the file extension')
+    exporter.add_argument('--batch-size', type=int, default=1000, help='rows fetched per round trip')
+    args = parser.parse_args()
+
+    try:
+        fmt = file_format(args.path, args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with app.app_context():
+        db.create_all()
+        # Exports select, and imports fill, columns added by later migrations
+        run_migrations(db.engine)
+        if args.command == 'import':
+            print(f"Importing {args.kind} from {args.path}...")
+            records = read_records(args.path, fmt)
+            if args.kind == 'users':
+                stats = import_users(records, args.chunk_size, args.hash_workers)
+            else:
+                stats = import_children(records, args.chunk_size)
+            stats.report(args.kind)
+        else:
+            print(f"Exporting {args.kind} to {args.path}...")
+            count = export_records(args.kind, args.path, fmt, args.batch_size)
+            print(f"Exported {count} {args.kind}")
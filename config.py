@@ -1,9 +1,82 @@
 import os
 from datetime import timedelta
 
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+def database_url():
+    """DATABASE_URL, accepting the postgres:// scheme some hosts still hand out"""
+    url = os.environ.get('DATABASE_URL', 'sqlite:///cognitive_skills.db')
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def engine_options(url):
+    """SQLAlchemy engine options for the configured database, overridable through DB_* variables"""
+    if url.startswith('sqlite'):
+        # pysqlite's timeout is how long a writer waits for the lock before 'database is locked'
+        return {'connect_args': {'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000}}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+    }
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production-12345'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///cognitive_skills.db'
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Run on every new SQLite connection. WAL lets requests keep reading while a worker commits,
+    # and synchronous=NORMAL is still crash-safe in WAL mode. SQLITE_PRAGMAS=off leaves SQLite defaults.
+    SQLITE_PRAGMAS = {} if os.environ.get('SQLITE_PRAGMAS') == 'off' else {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    }
     REMEMBER_COOKIE_DURATION = timedelta(days=7)
-    SESSION_COOKIE_SECURE = False
\ No newline at end of file
+    SESSION_COOKIE_SECURE = False
+    
+    # Question bank: 'lazy' builds each age group on first use, 'eager' builds all at startup
+    QUESTION_BANK_MODE = os.environ.get('QUESTION_BANK_MODE', 'lazy')
+    QUESTION_BANK_SIZE = int(os.environ.get('QUESTION_BANK_SIZE', 500))
+    # Precompiled bank written by build_question_bank.py; generated on the fly when missing
+    QUESTION_BANK_SNAPSHOT = os.environ.get('QUESTION_BANK_SNAPSHOT',
+                                            os.path.join(basedir, 'question_bank.snapshot'))
+    # Upper bound on questions held per age group; 'fifo' evicts the oldest when growing past it,
+    # 'none' stops growing instead
+    QUESTION_BANK_CAPACITY = int(os.environ.get('QUESTION_BANK_CAPACITY', 5000))
+    QUESTION_BANK_EVICTION = os.environ.get('QUESTION_BANK_EVICTION', 'fifo')
+    # Load the bank from the Question table (written by build_question_bank.py --table) so every
+    # worker serves the same questions; falls back to the snapshot when the table is empty
+    QUESTION_BANK_TABLE = os.environ.get('QUESTION_BANK_TABLE', '0') == '1'
+    # Age groups with more questions than this stay in the table and are sampled with indexed
+    # lookups per test instead of being loaded into memory
+    QUESTION_BANK_TABLE_MEMORY_LIMIT = int(os.environ.get('QUESTION_BANK_TABLE_MEMORY_LIMIT', 100000))
+    # Regenerate built banks in the background every N seconds (0 disables rotation);
+    # with QUESTION_BANK_TABLE the banks are reloaded from the table instead
+    QUESTION_BANK_REFRESH_SECONDS = float(os.environ.get('QUESTION_BANK_REFRESH_SECONDS', 0))
+    
+    # Test attempts issued by start_test: 'memory' (per process) or 'sqlite' (shared by all workers)
+    ATTEMPT_CACHE_BACKEND = os.environ.get('ATTEMPT_CACHE_BACKEND', 'memory')
+    ATTEMPT_CACHE_PATH = os.environ.get('ATTEMPT_CACHE_PATH', os.path.join(basedir, 'attempts.db'))
+    ATTEMPT_CACHE_TTL = int(os.environ.get('ATTEMPT_CACHE_TTL', 2 * 60 * 60))
+    ATTEMPT_CACHE_SIZE = int(os.environ.get('ATTEMPT_CACHE_SIZE', 10000))
+    
+    # Cohort percentiles: how often each worker saves new scores to ScoreHistogram and reloads
+    # everyone else's (0 saves after every submission instead)
+    SCORE_SKETCH_SYNC_SECONDS = float(os.environ.get('SCORE_SKETCH_SYNC_SECONDS', 30))
+    
+    # Test results shown per page on the results page and per /api/results request
+    RESULTS_PAGE_SIZE = int(os.environ.get('RESULTS_PAGE_SIZE', 10))
+    
+    # Write-behind for submit_test: batch results into one transaction every RESULT_BATCH_MAX_DELAY_MS
+    # or RESULT_BATCH_MAX_ROWS rows. Each request still waits for its batch to commit.
+    RESULT_WRITE_BEHIND = os.environ.get('RESULT_WRITE_BEHIND', '0') == '1'
+    RESULT_BATCH_MAX_ROWS = int(os.environ.get('RESULT_BATCH_MAX_ROWS', 50))
+    RESULT_BATCH_MAX_DELAY_MS = float(os.environ.get('RESULT_BATCH_MAX_DELAY_MS', 10))
+    
+    # Per-process cache of logged-in users for Flask-Login (0 disables it and queries User per request)
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
@@ -1,15 +1,94 @@
 # Extended database models for the application
-from app import db
+from app import db, TestResult
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from question_pool import question_fingerprint
 import json
+import random
+
+def upsert(model, rows, keys, updates=None):
+    """INSERT ... ON CONFLICT DO UPDATE for SQLite and PostgreSQL.
+    
+    `updates` receives the statement's `excluded` row and returns the
+    column assignments for rows that already exist; without it existing
+    rows are left alone (ON CONFLICT DO NOTHING). Returns False without
+    doing anything on other databases, so callers can fall back.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        return False
+    insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+    stmt = insert(model).values(rows)
+    if updates is None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=keys, set_=updates(stmt.excluded))
+    db.session.execute(stmt)
+    return True
 
 class ProgressTracking(db.Model):
+    """Daily rollup of a child's results in one question category"""
+    __table_args__ = (db.UniqueConstraint('child_id', 'date', 'category', name='uq_progress_child_date_category'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     child_id = db.Column(db.Integer, db.ForeignKey('child.id'), nullable=False)
-    date = db.Column(db.Date, default=datetime.utcnow().date, nullable=False)
+    date = db.Column(db.Date, default=lambda: datetime.utcnow().date(), nullable=False)
     category = db.Column(db.String(50), nullable=False)
-    score = db.Column(db.Float, nullable=False)
+    score = db.Column(db.Float, nullable=False)  # Accuracy over all questions in the rollup
     time_taken = db.Column(db.Integer)  # Time in seconds
+    test_count = db.Column(db.Integer, nullable=False, default=0)
+    questions = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def record(cls, child_id, day, categories, time_taken=None):
+        """Add one test's per-category results to the child's rollups for `day`.
+        
+        `categories` maps category to {'total', 'correct'} as returned by
+        QuestionBank.grade_answers(). The test's time is shared between
+        categories by question count. Runs as a single upsert in the
+        caller's transaction.
+        """
+        question_count = sum(stats['total'] for stats in categories.values())
+        rows = [{
+            'child_id': child_id,
+            'date': day,
+            'category': category,
+            'score': stats['correct'] / stats['total'] * 100,
+            'time_taken': round(time_taken * stats['total'] / question_count) if time_taken is not None else None,
+            'test_count': 1,
+            'questions': stats['total'],
+            'correct': stats['correct']
+        } for category, stats in categories.items() if stats['total'] > 0]
+        if not rows:
+            return
+        
+        upserted = upsert(cls, rows, ['child_id', 'date', 'category'], lambda excluded: {
+            'test_count': cls.test_count + excluded.test_count,
+            'questions': cls.questions + excluded.questions,
+            'correct': cls.correct + excluded.correct,
+            'score': (cls.correct + excluded.correct) * 100.0 / (cls.questions + excluded.questions),
+            'time_taken': db.func.coalesce(cls.time_taken, 0) + db.func.coalesce(excluded.time_taken, 0)
+        })
+        if not upserted:
+            cls._record_rows(rows)
+    
+    @classmethod
+    def _record_rows(cls, rows):
+        # Portable read-modify-write for databases without INSERT ... ON CONFLICT
+        for row in rows:
+            rollup = cls.query.filter_by(child_id=row['child_id'], date=row['date'],
+                                         category=row['category']).first()
+            if rollup is None:
+                db.session.add(cls(**row))
+                continue
+            rollup.test_count += row['test_count']
+            rollup.questions += row['questions']
+            rollup.correct += row['correct']
+            rollup.score = rollup.correct * 100.0 / rollup.questions
+            if row['time_taken'] is not None:
+                rollup.time_taken = (rollup.time_taken or 0) + row['time_taken']
     
     def to_dict(self):
         return {
@@ -18,10 +97,157 @@ class ProgressTracking(db.Model):
             'date': self.date.isoformat() if self.date else None,
             'category': self.category,
             'score': self.score,
-            'time_taken': self.time_taken
+            'time_taken': self.time_taken,
+            'test_count': self.test_count,
+            'questions': self.questions,
+            'correct': self.correct
+        }
+
+class ChildProgress(db.Model):
+    """Running score aggregates for one child, updated as each test result is saved"""
+    child_id = db.Column(db.Integer, db.ForeignKey('child.id'), primary_key=True)
+    test_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0)
+    min_score = db.Column(db.Float)
+    max_score = db.Column(db.Float)
+    first_score = db.Column(db.Float)
+    first_taken_at = db.Column(db.DateTime)
+    latest_score = db.Column(db.Float)
+    latest_taken_at = db.Column(db.DateTime)
+    
+    @classmethod
+    def _folded(cls, score, taken_at):
+        # Assignments adding one result to a stored row; SET expressions all see the old values
+        return {
+            'test_count': cls.test_count + 1,
+            'score_sum': cls.score_sum + score,
+            'min_score': db.case((db.or_(cls.min_score.is_(None), cls.min_score > score), score),
+                                 else_=cls.min_score),
+            'max_score': db.case((db.or_(cls.max_score.is_(None), cls.max_score < score), score),
+                                 else_=cls.max_score),
+            'first_score': db.case((db.or_(cls.first_taken_at.is_(None), cls.first_taken_at > taken_at), score),
+                                   else_=cls.first_score),
+            'first_taken_at': db.case((db.or_(cls.first_taken_at.is_(None), cls.first_taken_at > taken_at),
+                                       taken_at), else_=cls.first_taken_at),
+            'latest_score': db.case((db.or_(cls.latest_taken_at.is_(None), cls.latest_taken_at <= taken_at),
+                                     score), else_=cls.latest_score),
+            'latest_taken_at': db.case((db.or_(cls.latest_taken_at.is_(None), cls.latest_taken_at <= taken_at),
+                                        taken_at), else_=cls.latest_taken_at)
         }
+    
+    @classmethod
+    def _from_history(cls, child_id):
+        """Column values summarising every saved result of a child"""
+        history = TestResult.query.filter_by(child_id=child_id)
+        count, total, lowest, highest = history.with_entities(
+            db.func.count(TestResult.id), db.func.sum(TestResult.score),
+            db.func.min(TestResult.score), db.func.max(TestResult.score)).one()
+        row = dict.fromkeys(['min_score', 'max_score', 'first_score', 'first_taken_at',
+                             'latest_score', 'latest_taken_at'])
+        row.update(child_id=child_id, test_count=count, score_sum=total or 0)
+        if count:
+            first = history.order_by(TestResult.taken_at, TestResult.id).first()
+            latest = history.order_by(TestResult.taken_at.desc(), TestResult.id.desc()).first()
+            row.update(min_score=lowest, max_score=highest,
+                       first_score=first.score, first_taken_at=first.taken_at,
+                       latest_score=latest.score, latest_taken_at=latest.taken_at)
+        return row
+    
+    @classmethod
+    def record(cls, child_id, score, taken_at):
+        """Fold one test result, already flushed to the session, into the child's aggregates.
+        
+        The update is a single SQL statement, so concurrent submissions for
+        the same child cannot overwrite each other's counts. A child without
+        a row gets one built from its history, which includes this result;
+        if another transaction creates the row first, the insert turns into
+        the same update.
+        """
+        folded = cls._folded(score, taken_at)
+        if cls.query.filter_by(child_id=child_id).update(folded, synchronize_session=False):
+            return
+        if not upsert(cls, [cls._from_history(child_id)], ['child_id'], lambda excluded: folded):
+            db.session.add(cls(**cls._from_history(child_id)))
+    
+    @classmethod
+    def for_child(cls, child_id):
+        """Return a child's aggregates, building them from past results the first time"""
+        progress = cls.query.get(child_id)
+        if progress is not None:
+            return progress
+        
+        # A concurrent request may build the same row; whichever insert lands first is kept
+        row = cls._from_history(child_id)
+        if upsert(cls, [row], ['child_id']):
+            return cls.query.get(child_id)
+        progress = cls(**row)
+        db.session.add(progress)
+        return progress
+    
+    def to_dict(self):
+        """Progress summary in the shape returned by TestAnalyzer.calculate_progress()"""
+        if not self.test_count or self.test_count < 2:
+            return None
+        return {
+            'first_test': self.first_score,
+            'latest_test': self.latest_score,
+            'improvement': self.latest_score - self.first_score,
+            'average_score': self.score_sum / self.test_count,
+            'test_count': self.test_count,
+            'min_score': self.min_score,
+            'max_score': self.max_score,
+            'trend': 'improving' if self.latest_score > self.first_score else 'stable' if self.latest_score == self.first_score else 'declining'
+        }
+
+class ScoreHistogram(db.Model):
+    """Persisted score_sketch.ScoreSketches counts: scores per age group, category and 0.1-point bin"""
+    __table_args__ = (db.UniqueConstraint('age_group', 'category', 'bin', name='uq_score_histogram_bin'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    age_group = db.Column(db.String(10), nullable=False)
+    category = db.Column(db.String(50), nullable=False, default='')  # '' for overall scores
+    bin = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def merge(cls, rows):
+        """Add (age_group, category, bin, count) deltas to the stored counts"""
+        values = [{'age_group': age_group, 'category': category, 'bin': position, 'count': count}
+                  for age_group, category, position, count in rows]
+        if not values:
+            return
+        if upsert(cls, values, ['age_group', 'category', 'bin'],
+                  lambda excluded: {'count': cls.count + excluded.count}):
+            return
+        for value in values:
+            stored = cls.query.filter_by(age_group=value['age_group'], category=value['category'],
+                                         bin=value['bin']).first()
+            if stored is None:
+                db.session.add(cls(**value))
+            else:
+                stored.count += value['count']
+    
+    @classmethod
+    def totals(cls):
+        """All stored counts as (age_group, category, bin, count) rows"""
+        return cls.query.with_entities(cls.age_group, cls.category, cls.bin, cls.count).all()
 
 class Question(db.Model):
+    """Persistent question bank, one row per question id.
+    
+    `position` is the question's serial within its age group (its id is
+    "<age_group>-<position>") and positions are contiguous, so a random
+    draw picks random numbers in [min, max] and fetches those rows through
+    the (age_group, position) index instead of ORDER BY RANDOM().
+    `stratum_position` numbers questions 0..n-1 within each (age_group,
+    question_type, difficulty), giving the same dense ranges for filtered
+    draws.
+    """
+    __table_args__ = (
+        db.Index('uq_question_age_group_position', 'age_group', 'position', unique=True),
+        db.Index('ix_question_stratum', 'age_group', 'question_type', 'difficulty', 'stratum_position'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     age_group = db.Column(db.String(10), nullable=False)  # '6-8', '9-11', '12-14'
     question_type = db.Column(db.String(50), nullable=False)  # 'pattern', 'matrix', 'analogy', 'sequence'
@@ -29,9 +255,151 @@ class Question(db.Model):
     question_data = db.Column(db.Text, nullable=False)  # JSON string with question details
     correct_answer = db.Column(db.String(200), nullable=False)
     category = db.Column(db.String(100), nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    stratum_position = db.Column(db.Integer, nullable=False, default=0)
     
     def get_question_data(self):
         return json.loads(self.question_data)
     
     def set_question_data(self, data):
-        self.question_data = json.dumps(data)
\ No newline at end of file
+        self.question_data = json.dumps(data)
+    
+    def to_question(self):
+        """The question dict served by QuestionBank"""
+        data = self.get_question_data()
+        return {
+            'id': f"{self.age_group}-{self.position}",
+            'type': self.question_type,
+            'question': data['question'],
+            'options': data['options'],
+            'correct_answer': self.correct_answer,
+            'difficulty': self.difficulty,
+            'category': self.category
+        }
+    
+    @classmethod
+    def save_pool(cls, pool, batch_size=1000):
+        """Replace an age group's questions with a QuestionPool's, keeping its ids. The caller commits."""
+        cls.query.filter_by(age_group=pool.prefix).delete()
+        strata = {}
+        rows = []
+        for offset, question in enumerate(pool):
+            stratum = (question['type'], question['difficulty'])
+            stratum_position = strata.get(stratum, 0)
+            strata[stratum] = stratum_position + 1
+            rows.append({
+                'age_group': pool.prefix,
+                'question_type': question['type'],
+                'difficulty': question['difficulty'],
+                'question_data': json.dumps({'question': question['question'], 'options': question['options']}),
+                'correct_answer': question['correct_answer'],
+                'category': question['category'],
+                'position': pool.first_serial + offset,
+                'stratum_position': stratum_position
+            })
+            if len(rows) == batch_size:
+                db.session.execute(db.insert(cls), rows)
+                rows = []
+        if rows:
+            db.session.execute(db.insert(cls), rows)
+    
+    @classmethod
+    def age_groups(cls):
+        return [age_group for (age_group,) in db.session.query(cls.age_group).distinct()]
+    
+    @classmethod
+    def position_range(cls, age_group):
+        """(first, last) position of an age group, or None if it has no questions"""
+        first, last = db.session.query(db.func.min(cls.position), db.func.max(cls.position)) \
+            .filter(cls.age_group == age_group).one()
+        return (first, last) if first is not None else None
+    
+    @classmethod
+    def version(cls, age_group):
+        """Identifies the current rows of an age group, which save_pool() rewrites with new ids"""
+        first_id, count = db.session.query(db.func.min(cls.id), db.func.count(cls.id)) \
+            .filter(cls.age_group == age_group).one()
+        return f"table-{first_id}-{count}" if count else None
+    
+    @classmethod
+    def by_positions(cls, age_group, positions):
+        """Question dicts at the given positions, in that order, or None if any is missing"""
+        rows = {row.position: row for row in
+                cls.query.filter(cls.age_group == age_group, cls.position.in_(positions))}
+        if any(position not in rows for position in positions):
+            return None
+        return [rows[position].to_question() for position in positions]
+    
+    @classmethod
+    def load_questions(cls, age_group, batch_size=1000):
+        """Question dicts of an age group in position order, fetched `batch_size` at a time"""
+        for question in cls.query.filter_by(age_group=age_group).order_by(cls.position).yield_per(batch_size):
+            yield question.to_question()
+    
+    @classmethod
+    def stratum_sizes(cls, age_group, question_types=None, min_difficulty=None, max_difficulty=None):
+        """{(question_type, difficulty): count} for the strata matching the filters.
+        
+        Sizes come from MAX(stratum_position) over the stratum index, without reading question rows.
+        """
+        query = db.session.query(cls.question_type, cls.difficulty, db.func.max(cls.stratum_position)) \
+            .filter(cls.age_group == age_group)
+        if question_types is not None:
+            query = query.filter(cls.question_type.in_(question_types))
+        if min_difficulty is not None:
+            query = query.filter(cls.difficulty >= min_difficulty)
+        if max_difficulty is not None:
+            query = query.filter(cls.difficulty <= max_difficulty)
+        return {(question_type, difficulty): last + 1
+                for question_type, difficulty, last in query.group_by(cls.question_type, cls.difficulty)}
+    
+    @classmethod
+    def sample(cls, age_group, count=10, question_types=None, min_difficulty=None, max_difficulty=None,
+               exclude=None, rng=random):
+        """Draw up to `count` random question dicts straight from the table.
+        
+        Random offsets into the dense position ranges are fetched with
+        indexed IN queries, so the cost depends on `count`, not on the size
+        of the bank. As with QuestionPool.sample, repeated content and
+        fingerprints in `exclude` are only used to fill a shortfall.
+        """
+        candidates = 4 * count
+        if question_types is None and min_difficulty is None and max_difficulty is None:
+            bounds = cls.position_range(age_group)
+            if bounds is None:
+                return []
+            first, last = bounds
+            positions = rng.sample(range(first, last + 1), min(last - first + 1, candidates))
+            rows = cls.query.filter(cls.age_group == age_group, cls.position.in_(positions)).all()
+        else:
+            sizes = cls.stratum_sizes(age_group, question_types, min_difficulty, max_difficulty)
+            strata = sorted(sizes)
+            offsets = rng.sample(range(sum(sizes.values())), min(sum(sizes.values()), candidates))
+            wanted = {}
+            for offset in offsets:
+                for stratum in strata:
+                    if offset < sizes[stratum]:
+                        wanted.setdefault(stratum, []).append(offset)
+                        break
+                    offset -= sizes[stratum]
+            rows = []
+            for (question_type, difficulty), stratum_positions in wanted.items():
+                rows.extend(cls.query.filter(cls.age_group == age_group, cls.question_type == question_type,
+                                             cls.difficulty == difficulty,
+                                             cls.stratum_position.in_(stratum_positions)))
+        
+        rng.shuffle(rows)
+        picked = []
+        fallback = []
+        taken = set()
+        for row in rows:
+            question = row.to_question()
+            fingerprint = question_fingerprint(question)
+            if fingerprint in taken or (exclude is not None and fingerprint in exclude):
+                fallback.append(question)
+                continue
+            taken.add(fingerprint)
+            picked.append(question)
+            if len(picked) == count:
+                break
+        return picked + fallback[:count - len(picked)]
\ No newline at end of file
@@ -8,12 +8,38 @@ import sys
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+import argparse
+
 from app import app, db, init_database
+from migrations import check_query_plans
+
+def print_query_plans(title):
+    print(f"\nQuery plans {title}:")
+    with app.app_context():
+        try:
+            plans = check_query_plans(db.engine)
+        except Exception as e:
+            print(f"  unavailable: {str(e).splitlines()[0]}")
+            return
+    for name, plan, ok in plans:
+        status = '-' if ok is None else '✓' if ok else '✗ no index'
+        print(f"  {status} {name}")
+        for line in plan:
+            print(f"      {line}")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create the database tables and apply pending migrations')
+    parser.add_argument('--check-plans', action='store_true',
+                        help='show the query plans of hot queries before and after migrating')
+    args = parser.parse_args()
+    
+    if args.check_plans:
+        print_query_plans('before migrating')
     print("Initializing database...")
     init_database()
     print("Database initialized successfully!")
+    if args.check_plans:
+        print_query_plans('after migrating')
     print("\nTo run the application:")
     print("python app.py")
     print("Then open: http://localhost:5000")
\ No newline at end of file
@@ -0,0 +1,164 @@
+# Versioned schema migrations for databases created by older versions of the app
+from datetime import datetime
+from sqlalchemy import inspect, text
+
+from app import Child, TestResult
+from database import ProgressTracking, Question
+
+def _add_column(conn, column):
+    """ALTER TABLE ... ADD COLUMN for a model column, unless the table already has it"""
+    table = column.table
+    if column.name in {c['name'] for c in inspect(conn).get_columns(table.name)}:
+        return
+    preparer = conn.dialect.identifier_preparer
+    ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} " \
+          f"{column.type.compile(dialect=conn.dialect)}"
+    if not column.nullable:
+        # Existing rows need a value for NOT NULL columns
+        ddl += f" NOT NULL DEFAULT {column.default.arg!r}"
+    conn.execute(text(ddl))
+
+def _create_indexes(conn, table):
+    """Create the model's indexes on a table that was created before they were declared"""
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+def _attempt_columns(conn):
+    _add_column(conn, TestResult.__table__.c.attempt_number)
+    _add_column(conn, TestResult.__table__.c.bank_version)
+
+def _seen_questions_column(conn):
+    _add_column(conn, Child.__table__.c.seen_questions)
+
+def _progress_rollup_columns(conn):
+    table = ProgressTracking.__table__
+    for name in ('test_count', 'questions', 'correct'):
+        _add_column(conn, table.c[name])
+    # Tables created before the rollup key existed only get it as a unique index
+    if 'uq_progress_child_date_category' not in {c['name'] for c in inspect(conn).get_unique_constraints(table.name)}:
+        conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS uq_progress_child_date_category '
+                          'ON progress_tracking (child_id, date, category)'))
+
+def _hot_query_indexes(conn):
+    _create_indexes(conn, Child.__table__)
+    _create_indexes(conn, TestResult.__table__)
+
+def _question_positions(conn):
+    table = Question.__table__
+    for name in ('position', 'stratum_position'):
+        _add_column(conn, table.c[name])
+    # Number any existing rows densely before the unique index on (age_group, position) goes on
+    rows = conn.execute(text('SELECT id, age_group, question_type, difficulty FROM question '
+                             'ORDER BY age_group, id')).fetchall()
+    positions = {}
+    updates = []
+    for question_id, age_group, question_type, difficulty in rows:
+        position = positions.get(age_group, 0) + 1
+        positions[age_group] = position
+        stratum = (age_group, question_type, difficulty)
+        stratum_position = positions.get(stratum, 0)
+        positions[stratum] = stratum_position + 1
+        updates.append({'id': question_id, 'position': position, 'stratum_position': stratum_position})
+    if updates:
+        conn.execute(text('UPDATE question SET position = :position, stratum_position = :stratum_position '
+                          'WHERE id = :id'), updates)
+    _create_indexes(conn, table)
+
+def _question_serials_column(conn):
+    _add_column(conn, TestResult.__table__.c.question_serials)
+
+# (version, description, function) in the order they must run; never renumber or reorder
+MIGRATIONS = [
+    (1, 'test_result.attempt_number and bank_version', _attempt_columns),
+    (2, 'child.seen_questions', _seen_questions_column),
+    (3, 'progress_tracking rollup counts and unique key', _progress_rollup_columns),
+    (4, 'indexes on child.user_id and test_result (child_id, taken_at)', _hot_query_indexes),
+    (5, 'question.position and stratum_position with their indexes', _question_positions),
+    (6, 'test_result.question_serials', _question_serials_column),
+]
+
+def current_version(conn):
+    """Highest migration recorded in schema_version (0 for a database that has none)"""
+    if not inspect(conn).has_table('schema_version'):
+        return 0
+    return conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+
+def run_migrations(engine):
+    """Apply every migration newer than the database, each in its own transaction.
+
+    Migrations are written to be no-ops on tables db.create_all() has just
+    built, so this is safe to run on new and existing databases alike.
+    Returns the (version, description) pairs that were applied.
+    """
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE IF NOT EXISTS schema_version ('
+                          'version INTEGER PRIMARY KEY, description VARCHAR(200) NOT NULL, '
+                          'applied_at TIMESTAMP NOT NULL)'))
+        version = current_version(conn)
+
+    applied = []
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(text('INSERT INTO schema_version (version, description, applied_at) '
+                              'VALUES (:version, :description, :applied_at)'),
+                         {'version': number, 'description': description, 'applied_at': datetime.utcnow()})
+        applied.append((number, description))
+    return applied
+
+# Hot queries, the index each one should use and the schema version whose columns it needs,
+# for check_query_plans()
+HOT_QUERIES = [
+    ('children of a user', 'SELECT id FROM child WHERE user_id = :id', 'ix_child_user_id', 0),
+    ('results of a child, newest first',
+     'SELECT id, score FROM test_result WHERE child_id = :id ORDER BY taken_at DESC',
+     'ix_test_result_child_id_taken_at', 0),
+    ('user by username', 'SELECT id FROM "user" WHERE username = :id', None, 0),
+    ('user by email', 'SELECT id FROM "user" WHERE email = :id', None, 0),
+    ('questions by position', "SELECT id FROM question WHERE age_group = '9-11' AND position IN (:id, 7, 42)",
+     'uq_question_age_group_position', 5),
+    ('questions of one type and difficulty',
+     "SELECT id FROM question WHERE age_group = '9-11' AND question_type = 'matrix' AND difficulty = 2 "
+     "AND stratum_position IN (:id, 7, 42)", 'ix_question_stratum', 5),
+]
+
+def explain(conn, sql, params=None):
+    """Query plan for a statement, one line per step"""
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = conn.execute(text(prefix + sql), params or {}).fetchall()
+    return [str(row[-1]) for row in rows]
+
+def check_query_plans(engine):
+    """Explain each hot query and report whether it uses an index rather than scanning the table.
+
+    Returns a list of (name, plan_lines, ok). Where HOT_QUERIES names an
+    index, ok means that index appears in the plan; otherwise any index
+    lookup counts (e.g. the ones behind unique constraints). A query that
+    cannot be explained, e.g. because the database predates its columns,
+    gets ok None and the reason as its plan; the others are still checked.
+    """
+    with engine.connect() as conn:
+        version = current_version(conn)
+    
+    results = []
+    for name, sql, index, schema_version in HOT_QUERIES:
+        # Each query on its own connection, so a failure does not abort the others' transaction
+        try:
+            with engine.connect() as conn:
+                plan = explain(conn, sql, {'id': 1})
+        except Exception as e:
+            if version < schema_version:
+                reason = f"not available (schema < v{schema_version})"
+            else:
+                reason = f"not available: {str(e).splitlines()[0]}"
+            results.append((name, [reason], None))
+            continue
+        text_plan = ' '.join(plan)
+        if index is not None:
+            ok = index in text_plan
+        else:
+            ok = 'INDEX' in text_plan.upper()
+        results.append((name, plan, ok))
+    return results
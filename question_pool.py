@@ -0,0 +1,297 @@
+import hashlib
+import json
+import random
+from array import array
+from collections.abc import Sequence
+
+# Fields a sample can be balanced over, as positions in a stratum key
+STRATUM_FIELDS = {'type': 0, 'category': 1, 'difficulty': 2}
+
+def selection_seed(child_id, attempt_number, bank_version):
+    """Seed that makes a child's question selection reproducible from a few stored values"""
+    key = f"{child_id}:{attempt_number}:{bank_version}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big')
+
+def question_serial(question_id):
+    """The number at the end of an issued question id ("9-11-42" -> 42)"""
+    return int(str(question_id).rpartition('-')[2])
+
+def pack_serials(question_ids):
+    """Serials of issued question ids in issue order, 4 bytes each, for storing with a result"""
+    return array('I', map(question_serial, question_ids)).tobytes()
+
+def unpack_serials(data):
+    serials = array('I')
+    serials.frombytes(data)
+    return serials.tolist()
+
+def template_fingerprint(key):
+    """Stable 64-bit hash of a question's content, used to spot repeats across ids and banks"""
+    data = json.dumps(key, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+def question_fingerprint(question):
+    """template_fingerprint() for a question dict"""
+    return template_fingerprint((question['type'], question['question'], question['options'],
+                                 question['correct_answer'], question['difficulty'], question['category']))
+
+class QuestionTemplate:
+    """Shared body of a bank question: everything except its id"""
+    __slots__ = ('type', 'question', 'options', 'correct_answer', 'difficulty', 'category', '_fingerprint')
+
+    def __init__(self, type, question, options, correct_answer, difficulty, category):
+        self.type = type
+        self.question = question
+        self.options = options
+        self.correct_answer = correct_answer
+        self.difficulty = difficulty
+        self.category = category
+        self._fingerprint = None
+
+    def key(self):
+        return (self.type, self.question, self.options, self.correct_answer, self.difficulty, self.category)
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = template_fingerprint(self.key())
+        return self._fingerprint
+
+    def to_dict(self, question_id):
+        return {
+            'id': question_id,
+            'type': self.type,
+            'question': self.question,
+            'options': list(self.options),
+            'correct_answer': self.correct_answer,
+            'difficulty': self.difficulty,
+            'category': self.category
+        }
+
+class QuestionPool(Sequence):
+    """Compact question list for one age group.
+
+    Identical questions are stored once as interned QuestionTemplate objects
+    (with shared option tuples) and the pool itself is just an array of
+    template indexes. Question ids are derived from position, so an entry
+    costs 4 bytes. Indexing returns a regular question dict.
+
+    Positions are also indexed by (type, category, difficulty), in one
+    array per stratum, so sample() can draw balanced selections without
+    scanning the pool. That index costs another 4 bytes per entry.
+
+    A pool is not modified once it has been published in a QuestionBank;
+    growth goes through grown(), which builds a new pool to swap in.
+    """
+
+    def __init__(self, prefix, questions=(), first_serial=1):
+        self.prefix = prefix
+        self.first_serial = first_serial
+        self.templates = []
+        self._template_index = {}
+        self._options = {}
+        self._entries = array('I')
+        self._strata = {}
+        self._version = None
+        self.extend(questions)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        template = self.templates[self._entries[index]]
+        return template.to_dict(f"{self.prefix}-{self.first_serial + index}")
+
+    def find(self, question_id):
+        """Return the template behind an id issued by this pool, or None.
+
+        Ids encode their position, so this is O(1) without a separate index.
+        """
+        prefix, _, serial = str(question_id).rpartition('-')
+        if prefix != self.prefix or not serial.isdigit():
+            return None
+        position = int(serial) - self.first_serial
+        if 0 <= position < len(self._entries):
+            return self.templates[self._entries[position]]
+        return None
+
+    def intern(self, question):
+        """Return the template index for a question dict, adding a template if it is new"""
+        options = tuple(question['options'])
+        options = self._options.setdefault(options, options)
+        template = QuestionTemplate(question['type'], question['question'], options,
+                                    question['correct_answer'], question['difficulty'], question['category'])
+        return self._intern_template(template)
+
+    def _intern_template(self, template):
+        key = template.key()
+        index = self._template_index.get(key)
+        if index is None:
+            index = len(self.templates)
+            self.templates.append(template)
+            self._template_index[key] = index
+        return index
+
+    def append(self, question):
+        self._add_entry(self.intern(question))
+
+    def _add_entry(self, template_index):
+        template = self.templates[template_index]
+        key = (template.type, template.category, template.difficulty)
+        self._strata.setdefault(key, array('I')).append(len(self._entries))
+        self._entries.append(template_index)
+        self._version = None
+
+    @property
+    def version(self):
+        """Short content hash identifying exactly this pool.
+
+        Computed on first use; published pools never change, so it is stable.
+        """
+        if self._version is None:
+            data = json.dumps([self.prefix, self.to_snapshot()], separators=(',', ':'), ensure_ascii=False)
+            self._version = hashlib.blake2b(data.encode('utf-8'), digest_size=8).hexdigest()
+        return self._version
+
+    def extend(self, questions):
+        for question in questions:
+            self.append(question)
+
+    def grown(self, questions, capacity=None):
+        """Return a new pool with `questions` appended.
+
+        When the result would exceed `capacity`, the oldest entries are
+        evicted first. Ids keep counting up, so an id is never reused for a
+        different question. Templates no longer referenced are dropped.
+        """
+        questions = list(questions)
+        keep = len(self._entries)
+        if capacity is not None:
+            questions = questions[max(0, len(questions) - capacity):]
+            keep = min(keep, capacity - len(questions))
+        evicted = len(self._entries) - keep
+
+        pool = QuestionPool(self.prefix, first_serial=self.first_serial + evicted)
+        for template_index in self._entries[evicted:]:
+            pool._add_entry(pool._intern_template(self.templates[template_index]))
+        pool.extend(questions)
+        return pool
+
+    def to_snapshot(self):
+        return {
+            'first_serial': self.first_serial,
+            'templates': [list(template.key()) for template in self.templates],
+            'entries': self._entries.tolist()
+        }
+
+    @classmethod
+    def from_snapshot(cls, prefix, data):
+        pool = cls(prefix, first_serial=data.get('first_serial', 1))
+        for type_, question, options, correct_answer, difficulty, category in data['templates']:
+            pool.intern({
+                'type': type_,
+                'question': question,
+                'options': options,
+                'correct_answer': correct_answer,
+                'difficulty': difficulty,
+                'category': category
+            })
+        for template_index in data['entries']:
+            pool._add_entry(template_index)
+        return pool
+
+    def sample(self, count=10, per_group=None, group_by='category', types=None,
+               categories=None, min_difficulty=None, max_difficulty=None, exclude=None, rng=random):
+        """Draw a balanced random selection of question dicts.
+
+        Strata matching the filters are grouped by `group_by` ('type',
+        'category' or 'difficulty'). `count` questions are spread as evenly
+        as the groups allow. With `per_group`, that many come from every
+        group first (e.g. two of each category) and the rest of `count` is
+        spread over groups with questions left; if the groups need more
+        than `count`, the fullest give up one each until it fits. Fewer
+        than `count` are returned only when the filters leave too few. Cost is
+        proportional to the number of strata plus questions drawn, not to
+        the size of the pool.
+
+        The same question content is not drawn twice, and templates whose
+        fingerprint is in `exclude` (e.g. a child's SeenFilter) are avoided
+        unless a group has nothing else left.
+        """
+        field = STRATUM_FIELDS[group_by]
+        groups = {}
+        for key, positions in self._strata.items():
+            type_, category, difficulty = key
+            if types is not None and type_ not in types:
+                continue
+            if categories is not None and category not in categories:
+                continue
+            if min_difficulty is not None and difficulty < min_difficulty:
+                continue
+            if max_difficulty is not None and difficulty > max_difficulty:
+                continue
+            groups.setdefault(key[field], []).append(positions)
+
+        group_keys = list(groups)
+        rng.shuffle(group_keys)
+        sizes = {g: sum(len(positions) for positions in groups[g]) for g in group_keys}
+
+        if per_group is not None:
+            quotas = {g: min(per_group, sizes[g]) for g in group_keys}
+            # Too many groups for count: take one less from the fullest groups, in shuffled order
+            excess = sum(quotas.values()) - count
+            while excess > 0:
+                largest = max(quotas.values())
+                for g in group_keys:
+                    if excess > 0 and quotas[g] == largest:
+                        quotas[g] -= 1
+                        excess -= 1
+        else:
+            quotas = dict.fromkeys(group_keys, 0)
+
+        # Spread whatever count still needs as evenly as the groups allow
+        remaining = count - sum(quotas.values())
+        open_groups = [g for g in group_keys if quotas[g] < sizes[g]]
+        while remaining > 0 and open_groups:
+            share, extra = divmod(remaining, len(open_groups))
+            for i, g in enumerate(open_groups):
+                take = min(share + (1 if i < extra else 0), sizes[g] - quotas[g])
+                quotas[g] += take
+                remaining -= take
+            open_groups = [g for g in open_groups if quotas[g] < sizes[g]]
+
+        selected = []
+        for g in group_keys:
+            selected.extend(self._pick(groups[g], sizes[g], quotas[g], rng, exclude))
+        rng.shuffle(selected)
+        return [self[position] for position in selected]
+
+    def _pick(self, position_lists, total, k, rng, exclude):
+        """Pick k distinct positions from the concatenation of several lists.
+
+        At most 4 * k candidates are drawn, so the cost stays proportional to
+        k. Repeated or excluded templates are only used to fill any shortfall.
+        """
+        picked = []
+        fallback = []
+        taken = set()
+        for offset in rng.sample(range(total), min(total, 4 * k)):
+            for positions in position_lists:
+                if offset < len(positions):
+                    position = positions[offset]
+                    break
+                offset -= len(positions)
+
+            fingerprint = self.templates[self._entries[position]].fingerprint
+            if fingerprint in taken or (exclude is not None and fingerprint in exclude):
+                fallback.append(position)
+                continue
+            taken.add(fingerprint)
+            picked.append(position)
+            if len(picked) == k:
+                break
+        return picked + fallback[:k - len(picked)]
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import mmap
+import os
+from datetime import datetime
+
+# Bump whenever the on-disk layout changes so old snapshots are rejected
+SNAPSHOT_VERSION = 2
+
+def write_snapshot(path, banks):
+    """Write QuestionPool banks to a snapshot file.
+
+    The file is a one-line JSON header (version, content hash, counts)
+    followed by the compact JSON body holding the banks.
+    """
+    data = {age_group: pool.to_snapshot() for age_group, pool in banks.items()}
+    body = json.dumps(data, separators=(',', ':'), sort_keys=True, ensure_ascii=False).encode('utf-8')
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'sha256': hashlib.sha256(body).hexdigest(),
+        'created_at': datetime.utcnow().isoformat(),
+        'counts': {age_group: len(questions) for age_group, questions in banks.items()}
+    }
+
+    # Write to a temp file and rename so running workers never see a partial snapshot
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(json.dumps(header, separators=(',', ':')).encode('utf-8'))
+        f.write(b'\n')
+        f.write(body)
+    os.replace(tmp_path, path)
+    return header
+
+def read_snapshot(path):
+    """Memory-map a snapshot file and return (header, banks).
+
+    The body is hashed and decoded straight from the mapping through a
+    memoryview, so the only copy made is the decoded text json.loads parses.
+    Each bank is returned in QuestionPool.to_snapshot() form.
+    Raises ValueError if the version is unknown or the content hash does not match.
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end = mm.find(b'\n')
+            if header_end < 0:
+                raise ValueError(f"{path}: missing snapshot header")
+            header = json.loads(mm[:header_end])
+            if header.get('version') != SNAPSHOT_VERSION:
+                raise ValueError(f"{path}: unsupported snapshot version {header.get('version')}")
+
+            # The view must be released before the mapping is closed
+            with memoryview(mm) as view:
+                body = view[header_end + 1:]
+                try:
+                    if hashlib.sha256(body).hexdigest() != header.get('sha256'):
+                        raise ValueError(f"{path}: content hash mismatch")
+                    text = str(body, 'utf-8')
+                finally:
+                    body.release()
+
+    return header, json.loads(text)
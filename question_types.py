@@ -0,0 +1,367 @@
+import random
+
+class QuestionType:
+    """A question type: fixed metadata plus a way to build questions in batches.
+
+    Subclasses implement build(rng) -> (question, options, correct_answer) or
+    override generate_batch(n, rng) when they can do better than one build per
+    question. Questions are returned without an id; callers assign them.
+    """
+
+    def __init__(self, name, category, difficulty):
+        self.name = name
+        self.category = category
+        self.difficulty = difficulty
+
+    def make(self, question, options, correct_answer):
+        return {
+            'type': self.name,
+            'question': question,
+            'options': list(options),
+            'correct_answer': correct_answer,
+            'difficulty': self.difficulty,
+            'category': self.category
+        }
+
+    def build(self, rng):
+        raise NotImplementedError
+
+    def generate_batch(self, n, rng=random):
+        return [self.make(*self.build(rng)) for _ in range(n)]
+
+class VariantType(QuestionType):
+    """A type with a fixed set of variants, compiled to question dicts once.
+
+    A batch is n random picks among the prebuilt dicts, so generating needs no
+    string building or comparisons.
+    """
+
+    def __init__(self, name, category, difficulty, variants):
+        super().__init__(name, category, difficulty)
+        self.variants = [self.make(question, options, correct) for question, options, correct in variants]
+
+    def generate_batch(self, n, rng=random):
+        return [dict(variant) for variant in rng.choices(self.variants, k=n)]
+
+class FunctionType(QuestionType):
+    """A type whose questions are randomised by a build function taking the rng"""
+
+    def __init__(self, name, category, difficulty, build):
+        super().__init__(name, category, difficulty)
+        self.build = build
+
+class QuestionTypeRegistry:
+    """Question types available to each age group, dispatched by name"""
+
+    def __init__(self):
+        self._types = {}
+
+    def register(self, age_group, question_type):
+        self._types.setdefault(age_group, {})[question_type.name] = question_type
+        return question_type
+
+    def get(self, age_group, name):
+        return self._types[age_group][name]
+
+    def types(self, age_group):
+        return list(self._types[age_group].values())
+
+    def generate(self, age_group, count, rng=random):
+        """Generate `count` questions, each of a type drawn uniformly for the age group.
+
+        Types are drawn up front and every type generates its share in one
+        batch; the results are then put back in draw order.
+        """
+        types = self.types(age_group)
+        picks = rng.choices(range(len(types)), k=count)
+        counts = [0] * len(types)
+        for pick in picks:
+            counts[pick] += 1
+        batches = [iter(question_type.generate_batch(n, rng)) for question_type, n in zip(types, counts)]
+        return [next(batches[pick]) for pick in picks]
+
+# ==================== QuestionBank types (app.py) ====================
+bank_types = QuestionTypeRegistry()
+
+def _options_with(correct, candidates, rng, k=4):
+    """k shuffled options: the correct answer plus k - 1 distinct distractors from candidates"""
+    distractors = [option for option in dict.fromkeys(candidates) if option != correct]
+    options = rng.sample(distractors, k - 1) + [correct]
+    rng.shuffle(options)
+    return options
+
+def _color_pattern(rng):
+    colors = ['Red 🔴', 'Blue 🔵', 'Green 🟢', 'Yellow 🟡', 'Orange 🟠', 'Purple 🟣']
+    pattern = rng.sample(colors, 4)
+    missing = rng.randint(0, 3)
+    correct = pattern[missing]
+    pattern[missing] = "❓"
+    return f"What color comes next?<br>{' → '.join(pattern)}", _options_with(correct, colors, rng), correct
+
+def _shape_pattern(rng):
+    shapes = ['⭐ Star', '▲ Triangle', '■ Square', '● Circle', '❤️ Heart', '♦️ Diamond']
+    sequence = [shapes[0], shapes[1], shapes[2], "?"]
+    return f"Complete the pattern:<br>{' → '.join(sequence)}", _options_with(shapes[3], shapes, rng), shapes[3]
+
+def _animal_pattern(rng):
+    animals = ['🐶 Dog', '🐱 Cat', '🐰 Rabbit', '🐻 Bear', '🦁 Lion', '🐘 Elephant']
+    pattern = [animals[j % len(animals)] for j in range(3)]
+    correct = animals[3 % len(animals)]
+    return f"Which animal comes next?<br>{' → '.join(pattern)} → ❓", _options_with(correct, animals, rng), correct
+
+def _size_order(rng):
+    items = [
+        ['Small', 'Medium', 'Large'],
+        ['Tiny', 'Small', 'Big', 'Huge'],
+        ['Baby', 'Child', 'Adult'],
+        ['Coin', 'Ball', 'Box', 'Car']
+    ]
+    item_set = rng.choice(items)
+    missing = rng.randint(0, len(item_set) - 1)
+    correct = item_set[missing]
+    item_set_display = item_set.copy()
+    item_set_display[missing] = '?'
+    return (f"Complete the size order:<br>{' < '.join(item_set_display)}",
+            _options_with(correct, item_set + ['Tiny', 'Small', 'Medium', 'Large', 'Big', 'Huge'], rng), correct)
+
+for _question_type in [
+    FunctionType('color_pattern', 'Color Patterns', 1, _color_pattern),
+    FunctionType('shape_pattern', 'Shape Patterns', 1, _shape_pattern),
+    FunctionType('animal_pattern', 'Animal Patterns', 2, _animal_pattern),
+    VariantType('number_sequence', 'Number Patterns', 2, [
+        ("Complete the number sequence:<br>1, 2, 3, 4, ?", ['5', '6', '10', '25'], '5'),
+        ("Complete the number sequence:<br>2, 4, 6, 8, ?", ['5', '6', '10', '25'], '10'),
+        ("Complete the number sequence:<br>5, 10, 15, 20, ?", ['5', '6', '10', '25'], '25'),
+        ("Complete the number sequence:<br>10, 9, 8, 7, ?", ['5', '6', '10', '25'], '6')
+    ]),
+    VariantType('picture_analogy', 'Picture Analogies', 2, [
+        ("Complete the analogy:<br>🐶 is to Dog = 🐱 is to ?", ['Cat', 'Dog', 'Bird', 'Fish'], 'Cat'),
+        ("Complete the analogy:<br>🍎 is to Apple = 🍌 is to ?", ['Banana', 'Apple', 'Orange', 'Grape'], 'Banana'),
+        ("Complete the analogy:<br>☀️ is to Sun = 🌙 is to ?", ['Moon', 'Star', 'Sun', 'Cloud'], 'Moon'),
+        ("Complete the analogy:<br>🚗 is to Car = ✈️ is to ?", ['Plane', 'Car', 'Train', 'Boat'], 'Plane')
+    ]),
+    FunctionType('size_order', 'Size Ordering', 2, _size_order)
+]:
+    bank_types.register('6-8', _question_type)
+
+_matrix_grid = ":<br>[1] [2] [3]<br>[4] [5] [6]<br>[7] [8] [?]"
+
+for _question_type in [
+    VariantType('matrix_pattern', 'Matrix Reasoning', 2, [
+        (f"Complete the 3×3 matrix where each number increases by 1{_matrix_grid}", ['9', '10', '11', '12'], '9'),
+        (f"Find the missing number in the pattern matrix{_matrix_grid}", ['9', '10', '11', '12'], '9'),
+        (f"Matrix with alternating colors and shapes{_matrix_grid}", ['9', '10', '11', '12'], '9'),
+        (f"Number matrix with diagonal pattern{_matrix_grid}", ['9', '10', '11', '12'], '9')
+    ]),
+    VariantType('number_series', 'Number Series', 2, [
+        ("What comes next in this series?<br>2, 4, 8, 16, ?", ["24", "28", "32", "36"], "32"),
+        ("What comes next in this series?<br>3, 6, 9, 12, ?", ["13", "14", "15", "16"], "15"),
+        ("What comes next in this series?<br>1, 4, 9, 16, ?", ["20", "23", "25", "30"], "25"),
+        ("What comes next in this series?<br>5, 10, 20, 40, ?", ["60", "70", "80", "90"], "80")
+    ]),
+    VariantType('word_analogy', 'Verbal Reasoning', 3, [
+        ("Complete the analogy:<br>Hot : Cold :: Day : ?", ["Night", "Morning", "Evening", "Noon"], "Night"),
+        ("Complete the analogy:<br>Pen : Write :: Knife : ?", ["Cut", "Sharp", "Metal", "Tool"], "Cut"),
+        ("Complete the analogy:<br>Bird : Fly :: Fish : ?", ["Swim", "Water", "Scale", "Ocean"], "Swim"),
+        ("Complete the analogy:<br>Doctor : Hospital :: Teacher : ?", ["School", "Class", "Student", "Book"], "School")
+    ]),
+    VariantType('pattern_completion', 'Pattern Completion', 2, [
+        ("Complete the pattern:<br>AB AB AB ?", ["AB", "BA", "AA", "BB"], "AB"),
+        ("Complete the pattern:<br>AABB AABB ?", ["AABB", "BBAA", "ABAB", "BABA"], "AABB"),
+        ("Complete the pattern:<br>123 234 345 ?", ["456", "567", "345", "234"], "456"),
+        ("Complete the pattern:<br>XXO XXO XXO ?", ["XXO", "XOX", "OXX", "OXO"], "XXO")
+    ]),
+    VariantType('logical_sequence', 'Logical Sequencing', 3, [
+        ("What comes next in this logical sequence?<br>Morning → Noon → Afternoon → ?",
+         ["Evening", "Night", "Dawn", "Midnight"], "Evening"),
+        ("What comes next in this logical sequence?<br>Seed → Sprout → Plant → ?",
+         ["Flower", "Tree", "Fruit", "Leaf"], "Flower"),
+        ("What comes next in this logical sequence?<br>Learn → Practice → Improve → ?",
+         ["Master", "Forget", "Repeat", "Teach"], "Master"),
+        ("What comes next in this logical sequence?<br>Question → Research → Answer → ?",
+         ["Verify", "Ask", "Forget", "Question"], "Verify")
+    ]),
+    VariantType('code_decoding', 'Code Decoding', 3, [
+        ("Code Decoding:<br>If A=1, B=2, C=3, then CAT = ?", ["3120", "123", "320", "312"], "3120"),
+        ("Code Decoding:<br>If DOG = 4157, then GOD = ?", ["7154", "4157", "1547", "7415"], "7154"),
+        ("Code Decoding:<br>If 123 means ABC, then 456 means ?", ["DEF", "GHI", "JKL", "MNO"], "DEF"),
+        ("Code Decoding:<br>Decode: X → A, Y → B, Z → C, then W → ?", ["D", "C", "B", "A"], "D")
+    ])
+]:
+    bank_types.register('9-11', _question_type)
+
+for _question_type in [
+    VariantType('advanced_matrix', 'Advanced Matrix', 3, [
+        ("Complete the matrix pattern:<br>[2][4][6]<br>[8][10][12]<br>[14][16][?]", ['18', '20', '22', '24'], '18')
+    ]),
+    VariantType('abstract_reasoning', 'Abstract Reasoning', 3, [
+        ("If all squares are rectangles, and some rectangles are red, then:",
+         ['Some squares are red', 'All red things are squares', 'No squares are red', 'Cannot determine'],
+         'Some squares are red')
+    ]),
+    VariantType('complex_analogy', 'Complex Analogies', 3, [
+        ("Complex Analogy:<br>Physics : Newton :: Biology : ?", ["Darwin", "Einstein", "Galileo", "Pasteur"], "Darwin"),
+        ("Complex Analogy:<br>Author : Book :: Architect : ?",
+         ["Building", "Blueprint", "Design", "Structure"], "Building"),
+        ("Complex Analogy:<br>Chemistry : Element :: Linguistics : ?",
+         ["Word", "Sentence", "Grammar", "Language"], "Word"),
+        ("Complex Analogy:<br>Mathematics : Theorem :: Law : ?",
+         ["Precedent", "Case", "Judge", "Verdict"], "Precedent")
+    ]),
+    VariantType('spatial_reasoning', 'Spatial Reasoning', 3, [
+        ("If a cube is rotated 90° clockwise, which face is on top?",
+         ['Front face', 'Right face', 'Top face', 'Back face'], 'Right face')
+    ]),
+    VariantType('deductive_logic', 'Deductive Logic', 4, [
+        ("Premise: If it rains, the ground is wet. Ground is wet. Conclusion?",
+         ['It is raining', 'It might be raining', 'Cannot determine', 'It is not raining'], 'It might be raining')
+    ]),
+    VariantType('verbal_reasoning', 'Verbal Reasoning', 3, [
+        ("Which word doesn't belong: Apple, Orange, Banana, Carrot?", ['Apple', 'Orange', 'Banana', 'Carrot'], 'Carrot')
+    ])
+]:
+    bank_types.register('12-14', _question_type)
+
+# ==================== AdvancedQuestionGenerator types (question_generator.py) ====================
+advanced_types = QuestionTypeRegistry()
+
+_colors = ['🔴', '🔵', '🟢', '🟡', '🟠', '🟣']
+_shapes = ['⭐', '⬜', '🔺', '🔶', '🔷', '❤️']
+
+def _color_sequence(rng):
+    sequence = rng.sample(_colors, 4)
+    missing_index = rng.randint(0, 3)
+    correct = sequence[missing_index]
+    sequence[missing_index] = "❓"
+    return f"What color comes next in the sequence?\n{' → '.join(sequence)}", _options_with(correct, _colors, rng), correct
+
+def _shape_size(rng):
+    sizes = ['Small', 'Medium', 'Large']
+    shapes_display = ['Star', 'Square', 'Triangle', 'Heart']
+    sequence = [f"{sizes[i % len(sizes)]} {shapes_display[i % len(shapes_display)]}" for i in range(3)]
+    correct = f"{sizes[3 % len(sizes)]} {shapes_display[3 % len(shapes_display)]}"
+    options = _options_with(correct, [f"{size} {shape}" for size in sizes for shape in shapes_display], rng)
+    return f"Complete the pattern:\n{' → '.join(sequence)} → ❓", options, correct
+
+def _simple_pattern(rng):
+    a, b = rng.sample(_shapes, 2)
+    repeats = rng.randint(2, 3)
+    sequence = [a, b] * repeats
+    options = rng.sample([a, b] + [shape for shape in _shapes if shape not in (a, b)][:2], 4)
+    return f"What comes next in the pattern?\n{' '.join(sequence)} ❓", options, a
+
+def _missing_piece(rng):
+    a, b, c = rng.sample(_colors, 3)
+    grid = [a, b, c, a, b, c, a, b, c]
+    missing_index = rng.randint(0, 8)
+    correct = grid[missing_index]
+    grid[missing_index] = "❓"
+    rows = '\n'.join(' '.join(grid[row * 3:row * 3 + 3]) for row in range(3))
+    options = rng.sample([a, b, c, rng.choice([x for x in _colors if x not in (a, b, c)])], 4)
+    return f"Which piece is missing?\n{rows}", options, correct
+
+def _complete_sequence(rng):
+    start = rng.randint(1, 5)
+    step = rng.randint(1, 3)
+    sequence = [start + step * i for i in range(4)]
+    correct = start + step * 4
+    options = [str(n) for n in rng.sample([correct, correct + 1, correct - 1, correct + step + 1], 4)]
+    return f"Count the stars: what number comes next?\n{', '.join(map(str, sequence))}, ❓", options, str(correct)
+
+for _question_type in [
+    FunctionType('color_sequence', 'Color Pattern Recognition', 1, _color_sequence),
+    FunctionType('shape_size', 'Size and Shape Pattern', 1, _shape_size),
+    FunctionType('simple_pattern', 'Simple Pattern Recognition', 2, _simple_pattern),
+    FunctionType('missing_piece', 'Missing Piece', 2, _missing_piece),
+    FunctionType('complete_sequence', 'Sequence Completion', 3, _complete_sequence)
+]:
+    advanced_types.register('6-8', _question_type)
+
+def _rotation_pattern(rng):
+    rotations = ['0°', '90°', '180°', '270°']
+    sequence = rng.sample(rotations, 3)
+    next_rotation = rotations[(rotations.index(sequence[-1]) + 1) % len(rotations)]
+    return f"The shapes are rotating. Pattern: {', '.join(sequence)}. What comes next?", rotations, next_rotation
+
+def _analogical_reasoning(rng):
+    analogies = [
+        ("Puppy : Dog :: Kitten : ?", "Cat", ["Cat", "Mouse", "Lion", "Puppy"]),
+        ("Glove : Hand :: Sock : ?", "Foot", ["Foot", "Shoe", "Leg", "Arm"]),
+        ("Bee : Hive :: Bird : ?", "Nest", ["Nest", "Tree", "Sky", "Egg"]),
+        ("Painter : Brush :: Writer : ?", "Pen", ["Pen", "Book", "Paper", "Desk"])
+    ]
+    analogy, correct, options = rng.choice(analogies)
+    return f"Complete the analogy:\n{analogy}", rng.sample(options, 4), correct
+
+def _series_completion(rng):
+    start = rng.randint(1, 9)
+    ratio = rng.choice([2, 3])
+    series = [start * ratio ** i for i in range(4)]
+    correct = start * ratio ** 4
+    options = [str(n) for n in rng.sample([correct, correct + ratio, series[-1] + ratio, correct * 2], 4)]
+    return f"What comes next in the series?\n{', '.join(map(str, series))}, ?", options, str(correct)
+
+def _rule_based(rng):
+    add = rng.randint(2, 6)
+    numbers = rng.sample(range(1, 20), 3)
+    pairs = ', '.join(f"{n} → {n + add}" for n in numbers[:2])
+    correct = numbers[2] + add
+    options = [str(n) for n in rng.sample([correct, correct + 1, correct - 1, correct + add], 4)]
+    return f"Find the rule: {pairs}. What does {numbers[2]} become?", options, str(correct)
+
+for _question_type in [
+    FunctionType('rotation_pattern', 'Rotation Pattern', 1, _rotation_pattern),
+    VariantType('matrix_logic', 'Matrix Logic', 2, [
+        ("Complete the 3x3 matrix:\n['A', 'B', 'C']\n['D', 'E', 'F']\n['G', 'H', '?']", ['H', 'I', 'J', 'K'], 'I')
+    ]),
+    FunctionType('analogical_reasoning', 'Analogical Reasoning', 2, _analogical_reasoning),
+    FunctionType('series_completion', 'Series Completion', 3, _series_completion),
+    FunctionType('rule_based', 'Rule-Based Reasoning', 3, _rule_based)
+]:
+    advanced_types.register('9-11', _question_type)
+
+def _spatial_rotation(rng):
+    directions = ['North', 'East', 'South', 'West']
+    facing = rng.randint(0, 3)
+    turns = rng.randint(1, 3)
+    clockwise = rng.choice([True, False])
+    correct = directions[(facing + (turns if clockwise else -turns)) % 4]
+    question = (f"An arrow points {directions[facing]}. It is turned 90° "
+                f"{'clockwise' if clockwise else 'counter-clockwise'} {turns} time(s). "
+                f"Which way does it point now?")
+    return question, directions, correct
+
+def _logical_deduction(rng):
+    names = rng.sample(['Ali', 'Sara', 'Omar', 'Lina', 'Zain', 'Maya'], 3)
+    question = (f"{names[0]} is taller than {names[1]}. {names[1]} is taller than {names[2]}. "
+                f"Who is the shortest?")
+    return question, rng.sample(names + ['Cannot determine'], 4), names[2]
+
+def _inferential_reasoning(rng):
+    scenarios = [
+        ("The streets are wet, but the sky is clear and the sun is out. What most likely happened?",
+         "It rained earlier", ["It rained earlier", "It is raining now", "It will rain soon", "It never rains here"]),
+        ("Every light in the house is off and the car is gone. What is most likely?",
+         "Nobody is home", ["Nobody is home", "There is a party", "The power is on", "Everyone is asleep in the car"]),
+        ("The milk smells sour and the date on the carton has passed. What should you infer?",
+         "The milk has gone bad", ["The milk has gone bad", "The milk is fresh", "The carton is new", "The date is wrong"])
+    ]
+    scenario, correct, options = rng.choice(scenarios)
+    return scenario, rng.sample(options, 4), correct
+
+for _question_type in [
+    VariantType('abstract_reasoning', 'Abstract Reasoning', 1, [
+        ("Find the next item in the sequence:\n2, 4, 8, 16, ?", ['24', '32', '30', '28'], "32"),
+        ("Find the next item in the sequence:\n1, 1, 2, 3, 5, ?", ['6', '7', '8', '9'], "8"),
+        ("Find the next item in the sequence:\nA, C, E, G, ?", ['H', 'I', 'J', 'K'], "I"),
+        ("Find the next item in the sequence:\n1, 4, 9, 16, ?", ['20', '25', '30', '36'], "25")
+    ]),
+    FunctionType('spatial_rotation', 'Spatial Rotation', 2, _spatial_rotation),
+    FunctionType('logical_deduction', 'Logical Deduction', 3, _logical_deduction),
+    VariantType('complex_matrix', 'Complex Matrix Reasoning', 3, [
+        ("In this 3x3 matrix, each cell follows two rules: one for rows and one for columns. Identify the missing cell.",
+         ['Pattern A', 'Pattern B', 'Pattern C', 'Pattern D'], 'Pattern B')
+    ]),
+    FunctionType('inferential_reasoning', 'Inferential Reasoning', 3, _inferential_reasoning)
+]:
+    advanced_types.register('12-14', _question_type)
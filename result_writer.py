@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+class WriteBehindQueue:
+    """Group commit for writes coming from many request threads.
+
+    submit() queues an item and returns a Future. A single writer thread
+    collects items until `max_rows` are waiting or `max_delay` seconds have
+    passed since the first one, then hands the whole batch to
+    `flush(items)`, which writes it in one transaction and returns one
+    result (or exception) per item. Callers that wait on their Future get
+    their response only once the batch holding their write is committed.
+    """
+
+    def __init__(self, flush, max_rows=50, max_delay=0.01):
+        self.flush = flush
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.failures = 0
+        self.flush_time = 0.0
+        self.max_flush_time = 0.0
+        self._thread = threading.Thread(target=self._run, name='result-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + self.max_delay
+            stopping = False
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        try:
+            results = self.flush([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.batches += 1
+            self.rows += len(batch)
+            self.flush_time += elapsed
+            self.max_flush_time = max(self.max_flush_time, elapsed)
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                with self._lock:
+                    self.failures += 1
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Write whatever is queued and stop the writer thread"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        """Queue depth, batch sizes and flush latency, for /health"""
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'batches': self.batches,
+                'rows': self.rows,
+                'failures': self.failures,
+                'avg_batch_rows': round(self.rows / self.batches, 2) if self.batches else 0,
+                'avg_flush_ms': round(self.flush_time / self.batches * 1000, 2) if self.batches else 0,
+                'max_flush_ms': round(self.max_flush_time * 1000, 2)
+            }
@@ -0,0 +1,169 @@
+import threading
+from array import array
+
+# Overall distributions are stored under this category
+ALL_CATEGORIES = ''
+
+class ScoreSketch:
+    """Fixed-bin histogram of percentage scores.
+
+    Scores from 0 to 100 fall into 0.1-point bins, so scores from tests of
+    up to 1000 questions are counted exactly. Adding a score is O(1) and a
+    percentile-rank query sums at most 1001 counters, a few microseconds.
+    """
+    BINS = 1001
+
+    def __init__(self, counts=None):
+        self.counts = array('q', counts) if counts is not None else array('q', bytes(8 * self.BINS))
+        self.total = sum(self.counts)
+
+    @classmethod
+    def bin(cls, score):
+        return min(cls.BINS - 1, max(0, int(round(score * 10))))
+
+    def add(self, score, count=1):
+        self.counts[self.bin(score)] += count
+        self.total += count
+
+    def percentile(self, score):
+        """Percentage of recorded scores below `score`, counting ties as half"""
+        if not self.total:
+            return None
+        position = self.bin(score)
+        below = sum(self.counts[:position])
+        return (below + self.counts[position] / 2) / self.total * 100
+
+    def quantile(self, fraction):
+        """Score at the given fraction (0-1) of the distribution"""
+        if not self.total:
+            return None
+        target = fraction * self.total
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return position / 10
+        return 100.0
+
+class ScoreSketches:
+    """Streaming score distributions per age group and per (age group, category).
+
+    Each worker counts new scores in memory as pending deltas. sync() hands
+    them to a persistence callback, which adds them to shared totals (e.g.
+    the ScoreHistogram table), and reloads the merged totals. Workers
+    therefore see each other's scores after at most one sync interval,
+    without reading test results on page views.
+    """
+
+    def __init__(self):
+        self._sketches = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.syncs = 0
+        self._syncer = None
+        self._stop_syncer = threading.Event()
+
+    def record(self, age_group, score, category_scores=None):
+        """Count one test: its overall score and, optionally, {category: accuracy}"""
+        entries = [(ALL_CATEGORIES, score)]
+        if category_scores:
+            entries.extend(category_scores.items())
+        with self._lock:
+            for category, value in entries:
+                key = (age_group, category)
+                sketch = self._sketches.get(key)
+                if sketch is None:
+                    sketch = self._sketches[key] = ScoreSketch()
+                sketch.add(value)
+                pending = self._pending.setdefault(key, {})
+                position = ScoreSketch.bin(value)
+                pending[position] = pending.get(position, 0) + 1
+
+    def percentile(self, age_group, score, category=ALL_CATEGORIES):
+        sketch = self._sketches.get((age_group, category))
+        return sketch.percentile(score) if sketch is not None else None
+
+    def quantile(self, age_group, fraction, category=ALL_CATEGORIES):
+        sketch = self._sketches.get((age_group, category))
+        return sketch.quantile(fraction) if sketch is not None else None
+
+    def count(self, age_group, category=ALL_CATEGORIES):
+        sketch = self._sketches.get((age_group, category))
+        return sketch.total if sketch is not None else 0
+
+    def take_pending(self):
+        """Remove and return pending deltas as (age_group, category, bin, count) rows"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return [(age_group, category, position, count)
+                for (age_group, category), bins in pending.items()
+                for position, count in bins.items()]
+
+    def restore_pending(self, rows):
+        """Put back deltas from take_pending() that could not be saved"""
+        with self._lock:
+            for age_group, category, position, count in rows:
+                bins = self._pending.setdefault((age_group, category), {})
+                bins[position] = bins.get(position, 0) + count
+
+    def load(self, rows):
+        """Replace the totals with persisted (age_group, category, bin, count) rows plus pending deltas"""
+        sketches = {}
+        for age_group, category, position, count in rows:
+            sketch = sketches.get((age_group, category))
+            if sketch is None:
+                sketch = sketches[(age_group, category)] = ScoreSketch()
+            sketch.counts[position] += count
+            sketch.total += count
+        with self._lock:
+            for key, bins in self._pending.items():
+                sketch = sketches.setdefault(key, ScoreSketch())
+                for position, count in bins.items():
+                    sketch.counts[position] += count
+                    sketch.total += count
+            self._sketches = sketches
+            self.loaded = True
+
+    def sync(self, merge, totals):
+        """Persist pending deltas with merge(rows), then reload from totals()"""
+        rows = self.take_pending()
+        try:
+            if rows:
+                merge(rows)
+        except Exception:
+            self.restore_pending(rows)
+            raise
+        self.load(totals())
+        self.syncs += 1
+
+    def start_syncer(self, interval, sync):
+        """Call sync() every `interval` seconds on a daemon thread"""
+        if self._syncer is not None:
+            return
+
+        def run():
+            while not self._stop_syncer.wait(interval):
+                try:
+                    sync()
+                except Exception as e:
+                    print(f"ScoreSketches: sync failed: {e}")
+
+        self._stop_syncer.clear()
+        self._syncer = threading.Thread(target=run, name='score-sketch-sync', daemon=True)
+        self._syncer.start()
+
+    def stop_syncer(self):
+        if self._syncer is not None:
+            self._stop_syncer.set()
+            self._syncer.join()
+            self._syncer = None
+
+    def stats(self):
+        """Scores counted per age group and deltas waiting to be saved, for /health"""
+        return {
+            'tests': {age_group: sketch.total for (age_group, category), sketch in self._sketches.items()
+                      if category == ALL_CATEGORIES},
+            'pending': sum(sum(bins.values()) for bins in self._pending.values()),
+            'syncs': self.syncs
+        }
@@ -0,0 +1,38 @@
+class SeenFilter:
+    """Bloom filter of question fingerprints a child has already been given.
+
+    The default 1 KB filter holds around 500 questions (about 50 tests) with
+    a false-positive rate under 0.3%; a false positive only means a question
+    is skipped that the child has not actually seen. Checking a candidate
+    costs the same however many tests have been taken.
+    """
+
+    def __init__(self, data=None, size_bytes=1024, hashes=4):
+        self.bits = bytearray(data) if data else bytearray(size_bytes)
+        self.size = len(self.bits) * 8
+        self.hashes = hashes
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(data)
+
+    def to_bytes(self):
+        return bytes(self.bits)
+
+    def _positions(self, fingerprint):
+        # Fingerprints are already 64-bit hashes; double hashing derives every probe from their halves
+        h1 = fingerprint & 0xFFFFFFFF
+        h2 = (fingerprint >> 32) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, fingerprint):
+        for position in self._positions(fingerprint):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def update(self, fingerprints):
+        for fingerprint in fingerprints:
+            self.add(fingerprint)
+
+    def __contains__(self, fingerprint):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(fingerprint))
@@ -316,6 +316,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 },
                 body: JSON.stringify({ 
                     answers: answers,
+                    attempt_token: attemptToken,
                     time_taken: (30 * 60) - timeLeft
                 })
             });
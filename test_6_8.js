@@ -370,11 +370,13 @@ document.addEventListener('DOMContentLoaded', function() {
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ 
                     answers: answers,
+                    attempt_token: attemptToken,
                     time_taken: (30 * 60) - timeLeft
                 })
             });
             
             const result = await response.json();
+            if (!response.ok || result.error) throw new Error(result.error || `Server error ${response.status}`);
             showResults6_8(result);
         } catch (error) {
             showError('Oops! Something went wrong. Please try again.');
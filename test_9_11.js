@@ -466,12 +466,14 @@ document.addEventListener('DOMContentLoaded', function() {
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ 
                     answers: answers,
+                    attempt_token: attemptToken,
                     time_taken: (30 * 60) - timeLeft,
                     start_time: startTime
                 })
             });
             
             const result = await response.json();
+            if (!response.ok || result.error) throw new Error(result.error || `Server error ${response.status}`);
             showResults9_11(result);
         } catch (error) {
             showError('Unable to submit results. Please check your connection.');
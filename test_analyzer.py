@@ -1,6 +1,19 @@
 import json
+import random
+import time
 from datetime import datetime, timedelta
 
+try:
+    import numpy as np
+except ImportError:  # analyze_cohort() falls back to the scalar path
+    np = None
+
+def _factorize(values, count):
+    """Return (distinct values in first-appearance order, array of their codes)"""
+    keys = list(dict.fromkeys(values))
+    lookup = {key: code for code, key in enumerate(keys)}
+    return keys, np.fromiter(map(lookup.__getitem__, values), dtype=np.intp, count=count)
+
 class TestAnalyzer:
     def __init__(self):
         self.cognitive_domains = {
@@ -11,6 +24,12 @@ class TestAnalyzer:
             'Abstract Reasoning': ['abstract_reasoning', 'rule_based', 'logical_deduction'],
             'Spatial Reasoning': ['spatial_rotation', 'shape_size']
         }
+        
+        # Inverted index: question type -> domains it counts towards
+        self.type_domains = {}
+        for domain, question_types in self.cognitive_domains.items():
+            for question_type in question_types:
+                self.type_domains.setdefault(question_type, []).append(domain)
     
     def analyze_results(self, answers, questions):
         """Analyze test results to identify strengths and weaknesses"""
@@ -21,44 +40,32 @@ class TestAnalyzer:
         for category in self.cognitive_domains:
             domain_stats[category] = {'total': 0, 'correct': 0, 'accuracy': 0}
         
-        # Process each answer
-        for i, answer in enumerate(answers):
-            question = questions[i]
+        # Process each answer once; the type index gives its domains without scanning them all
+        total_correct = 0
+        total_questions = 0
+        for answer, question in zip(answers, questions):
             category = answer.get('category', 'Unknown')
             is_correct = self._is_answer_correct(answer, question)
             
-            # Update category stats
-            if category not in category_stats:
-                category_stats[category] = {'total': 0, 'correct': 0}
-            category_stats[category]['total'] += 1
+            stats = category_stats.get(category)
+            if stats is None:
+                stats = category_stats[category] = {'total': 0, 'correct': 0}
+            stats['total'] += 1
+            total_questions += 1
             if is_correct:
-                category_stats[category]['correct'] += 1
+                stats['correct'] += 1
+                total_correct += 1
             
-            # Update domain stats
-            for domain, question_types in self.cognitive_domains.items():
-                if question['type'] in question_types:
-                    domain_stats[domain]['total'] += 1
-                    if is_correct:
-                        domain_stats[domain]['correct'] += 1
-        
-        # Calculate accuracies
-        for category in category_stats:
-            stats = category_stats[category]
-            if stats['total'] > 0:
-                stats['accuracy'] = (stats['correct'] / stats['total']) * 100
-        
-        for domain in domain_stats:
-            stats = domain_stats[domain]
-            if stats['total'] > 0:
-                stats['accuracy'] = (stats['correct'] / stats['total']) * 100
-        
-        # Identify strengths and weaknesses
-        weak_points = self._identify_weak_points(category_stats, domain_stats)
-        strong_points = self._identify_strong_points(category_stats, domain_stats)
+            for domain in self.type_domains.get(question['type'], ()):
+                stats = domain_stats[domain]
+                stats['total'] += 1
+                if is_correct:
+                    stats['correct'] += 1
+        
+        # Accuracies, strengths and weaknesses come from one pass over the aggregates
+        weak_points, strong_points = self._classify_points(category_stats, domain_stats)
         
         # Calculate overall score
-        total_correct = sum(stats['correct'] for stats in category_stats.values())
-        total_questions = sum(stats['total'] for stats in category_stats.values())
         overall_score = (total_correct / total_questions * 100) if total_questions > 0 else 0
         
         # Generate recommendations
@@ -75,62 +82,194 @@ class TestAnalyzer:
             'recommendations': recommendations
         }
     
-    def _is_answer_correct(self, answer, question):
-        """Check if answer is correct (simplified - in real app, compare with correct answer)"""
-        # For demo purposes, we'll use a weighted random based on difficulty
-        difficulty = question.get('difficulty', 2)
-        # Higher difficulty = lower chance of being correct
-        correct_chance = 0.9 - (difficulty * 0.1)
-        import random
-        return random.random() < correct_chance
+    def cohort_columns(self, attempts):
+        """Flatten (attempt_id, answers, questions) tuples into analyze_cohort() columns"""
+        attempt_ids = []
+        question_types = []
+        categories = []
+        correct = []
+        for attempt_id, answers, questions in attempts:
+            for answer, question in zip(answers, questions):
+                attempt_ids.append(attempt_id)
+                question_types.append(question['type'])
+                categories.append(answer.get('category', 'Unknown'))
+                correct.append(self._is_answer_correct(answer, question))
+        return attempt_ids, question_types, categories, correct
     
-    def _identify_weak_points(self, category_stats, domain_stats):
-        """Identify areas needing improvement"""
-        weak_points = []
+    def analyze_cohort(self, attempt_ids, question_types, categories, correct, columnar=False):
+        """Analyze many test attempts at once from columnar data.
         
-        # Check categories with accuracy < 50%
-        for category, stats in category_stats.items():
-            if stats.get('accuracy', 0) < 50 and stats['total'] >= 3:  # Need at least 3 questions
-                weak_points.append({
-                    'area': category,
-                    'accuracy': round(stats['accuracy'], 1),
-                    'type': 'category'
-                })
+        Each argument has one entry per answered question: the attempt it
+        belongs to, the question type, the category and whether the answer
+        was correct. Returns {attempt_id: analysis} in first-appearance
+        order, where every analysis is identical to what analyze_results()
+        gives for that attempt.
         
-        # Check domains with accuracy < 60%
-        for domain, stats in domain_stats.items():
-            if stats.get('accuracy', 0) < 60 and stats['total'] >= 5:  # Need at least 5 questions
-                weak_points.append({
-                    'area': domain,
-                    'accuracy': round(stats['accuracy'], 1),
-                    'type': 'domain'
-                })
+        Counting, accuracies and weak/strong flags are computed with NumPy
+        group-bys. With columnar=True those arrays are returned as they are,
+        skipping the per-attempt dicts (most of the cost for short tests).
+        Without NumPy each attempt goes through analyze_results().
+        """
+        if np is None:
+            if columnar:
+                raise RuntimeError('columnar cohort analysis requires numpy')
+            return self._analyze_cohort_scalar(attempt_ids, question_types, categories, correct)
+        
+        correct = np.asarray(correct, dtype=bool)
+        count = len(correct)
+        
+        # Attempts, categories and types as integer codes in order of first appearance
+        attempt_keys, attempt_codes = _factorize(attempt_ids, count)
+        category_keys, category_codes = _factorize(categories, count)
+        type_keys, type_codes = _factorize(question_types, count)
+        attempt_count = len(attempt_keys)
         
-        return weak_points
+        totals = np.bincount(attempt_codes, minlength=attempt_count)
+        corrects = np.bincount(attempt_codes[correct], minlength=attempt_count)
+        
+        # (attempt, category) groups, ordered by attempt and then by where each first appears
+        pair_codes = attempt_codes * len(category_keys) + category_codes
+        pairs, pair_first, pair_index = np.unique(pair_codes, return_index=True, return_inverse=True)
+        pair_index = pair_index.ravel()
+        order = np.lexsort((pair_first, pairs // max(1, len(category_keys))))
+        pair_attempts = (pairs // max(1, len(category_keys)))[order]
+        pair_categories = (pairs % max(1, len(category_keys)))[order]
+        pair_totals = np.bincount(pair_index, minlength=len(pairs))[order]
+        pair_corrects = np.bincount(pair_index[correct], minlength=len(pairs))[order]
+        
+        # Domain counts per attempt through a type x domain membership matrix
+        domains = list(self.cognitive_domains)
+        membership = np.array([[domain in self.type_domains.get(question_type, ()) for domain in domains]
+                               for question_type in type_keys], dtype=bool).reshape(len(type_keys), len(domains))
+        member = membership[type_codes]
+        domain_totals = np.zeros((attempt_count, len(domains)), dtype=np.int64)
+        domain_corrects = np.zeros((attempt_count, len(domains)), dtype=np.int64)
+        for d in range(len(domains)):
+            domain_totals[:, d] = np.bincount(attempt_codes[member[:, d]], minlength=attempt_count)
+            domain_corrects[:, d] = np.bincount(attempt_codes[member[:, d] & correct], minlength=attempt_count)
+        
+        # Accuracies and weak/strong flags, with the thresholds used by _classify_points()
+        pair_accuracy = pair_corrects / np.maximum(pair_totals, 1) * 100
+        domain_accuracy = domain_corrects / np.maximum(domain_totals, 1) * 100
+        arrays = {
+            'attempt_ids': attempt_keys,
+            'overall_score': np.round(corrects / np.maximum(totals, 1) * 100, 2),
+            'total_correct': corrects,
+            'total_questions': totals,
+            'categories': category_keys,
+            'pair_attempts': pair_attempts,
+            'pair_categories': pair_categories,
+            'pair_totals': pair_totals,
+            'pair_corrects': pair_corrects,
+            'pair_accuracy': pair_accuracy,
+            'pair_weak': (pair_totals >= 3) & (pair_accuracy < 50),
+            'pair_strong': (pair_totals >= 3) & (pair_accuracy > 80),
+            'domains': domains,
+            'domain_totals': domain_totals,
+            'domain_corrects': domain_corrects,
+            'domain_accuracy': domain_accuracy,
+            'domain_weak': (domain_totals >= 5) & (domain_accuracy < 60),
+            'domain_strong': (domain_totals >= 5) & (domain_accuracy > 75)
+        }
+        if columnar:
+            return arrays
+        return self._cohort_results(arrays)
     
-    def _identify_strong_points(self, category_stats, domain_stats):
-        """Identify areas of strength"""
-        strong_points = []
+    def _cohort_results(self, arrays):
+        """Expand analyze_cohort() arrays into analyze_results()-style dicts"""
+        # Work from plain lists; indexing NumPy scalars one by one is slow
+        categories = arrays['categories']
+        pair_rows = list(zip([categories[code] for code in arrays['pair_categories'].tolist()],
+                             arrays['pair_totals'].tolist(), arrays['pair_corrects'].tolist(),
+                             arrays['pair_accuracy'].tolist(), arrays['pair_weak'].tolist(),
+                             arrays['pair_strong'].tolist()))
+        pair_bounds = np.searchsorted(arrays['pair_attempts'], np.arange(len(arrays['attempt_ids']) + 1)).tolist()
+        domains = arrays['domains']
+        domain_rows = zip(arrays['domain_totals'].tolist(), arrays['domain_corrects'].tolist(),
+                          arrays['domain_accuracy'].tolist(), arrays['domain_weak'].tolist(),
+                          arrays['domain_strong'].tolist())
         
-        # Check categories with accuracy > 80%
-        for category, stats in category_stats.items():
-            if stats.get('accuracy', 0) > 80 and stats['total'] >= 3:
-                strong_points.append({
-                    'area': category,
-                    'accuracy': round(stats['accuracy'], 1),
-                    'type': 'category'
-                })
+        results = {}
+        for a, (attempt_id, total_questions, total_correct, domain_row) in enumerate(zip(
+                arrays['attempt_ids'], arrays['total_questions'].tolist(), arrays['total_correct'].tolist(),
+                domain_rows)):
+            category_stats = {}
+            weak_points = []
+            strong_points = []
+            for area, total, correct_count, accuracy, weak, strong in pair_rows[pair_bounds[a]:pair_bounds[a + 1]]:
+                category_stats[area] = {'total': total, 'correct': correct_count, 'accuracy': accuracy}
+                if weak:
+                    weak_points.append({'area': area, 'accuracy': round(accuracy, 1), 'type': 'category'})
+                elif strong:
+                    strong_points.append({'area': area, 'accuracy': round(accuracy, 1), 'type': 'category'})
+            
+            domain_stats = {}
+            for domain, total, correct_count, accuracy, weak, strong in zip(domains, *domain_row):
+                # analyze_results() leaves the initial integer 0 on domains with no questions
+                domain_stats[domain] = {'total': total, 'correct': correct_count, 'accuracy': accuracy if total else 0}
+                if weak:
+                    weak_points.append({'area': domain, 'accuracy': round(accuracy, 1), 'type': 'domain'})
+                elif strong:
+                    strong_points.append({'area': domain, 'accuracy': round(accuracy, 1), 'type': 'domain'})
+            
+            results[attempt_id] = {
+                'overall_score': round(total_correct / total_questions * 100, 2),
+                'total_correct': total_correct,
+                'total_questions': total_questions,
+                'category_stats': category_stats,
+                'domain_stats': domain_stats,
+                'weak_points': weak_points,
+                'strong_points': strong_points,
+                'recommendations': self._generate_recommendations(weak_points, domain_stats)
+            }
+        return results
+    
+    def _analyze_cohort_scalar(self, attempt_ids, question_types, categories, correct):
+        grouped = {}
+        for attempt_id, question_type, category, is_correct in zip(attempt_ids, question_types,
+                                                                     categories, correct):
+            answers, questions = grouped.setdefault(attempt_id, ([], []))
+            answers.append({'category': category, 'answer': bool(is_correct)})
+            questions.append({'type': question_type, 'correct_answer': True})
+        return {attempt_id: self.analyze_results(answers, questions)
+                for attempt_id, (answers, questions) in grouped.items()}
+    
+    def _is_answer_correct(self, answer, question):
+        """Check the submitted answer against the question's correct answer"""
+        return answer.get('answer') == question.get('correct_answer')
+    
+    def _classify_points(self, category_stats, domain_stats):
+        """Fill in accuracies and return (weak_points, strong_points).
         
-        # Check domains with accuracy > 75%
-        for domain, stats in domain_stats.items():
-            if stats.get('accuracy', 0) > 75 and stats['total'] >= 5:
-                strong_points.append({
-                    'area': domain,
-                    'accuracy': round(stats['accuracy'], 1),
-                    'type': 'domain'
-                })
+        Categories need at least 3 questions: below 50% is weak, above 80%
+        strong. Domains need at least 5: below 60% is weak, above 75% strong.
+        """
+        weak_points = []
+        strong_points = []
         
-        return strong_points
+        for kind, all_stats, min_total, weak_below, strong_above in (
+                ('category', category_stats, 3, 50, 80),
+                ('domain', domain_stats, 5, 60, 75)):
+            for area, stats in all_stats.items():
+                if stats['total'] > 0:
+                    stats['accuracy'] = (stats['correct'] / stats['total']) * 100
+                if stats['total'] < min_total:
+                    continue
+                accuracy = stats['accuracy']
+                if accuracy < weak_below:
+                    weak_points.append({'area': area, 'accuracy': round(accuracy, 1), 'type': kind})
+                elif accuracy > strong_above:
+                    strong_points.append({'area': area, 'accuracy': round(accuracy, 1), 'type': kind})
+        
+        return weak_points, strong_points
+    
+    def _identify_weak_points(self, category_stats, domain_stats):
+        """Identify areas needing improvement"""
+        return self._classify_points(category_stats, domain_stats)[0]
+    
+    def _identify_strong_points(self, category_stats, domain_stats):
+        """Identify areas of strength"""
+        return self._classify_points(category_stats, domain_stats)[1]
     
     def _generate_recommendations(self, weak_points, domain_stats):
         """Generate personalized recommendations based on weak areas"""
@@ -192,22 +331,102 @@ class TestAnalyzer:
         return recommendations[:5]  # Return top 5 recommendations
     
     def calculate_progress(self, child_id, previous_results):
-        """Calculate progress over time"""
+        """Calculate progress over time.
+        
+        One pass over the results, without sorting. The app keeps the same
+        figures up to date per child in database.ChildProgress instead of
+        recomputing them.
+        """
         if not previous_results or len(previous_results) < 2:
             return None
         
-        # Sort by date
-        sorted_results = sorted(previous_results, key=lambda x: x.taken_at)
+        first = latest = previous_results[0]
+        total = 0
+        lowest = highest = first.score
+        for result in previous_results:
+            if result.taken_at < first.taken_at:
+                first = result
+            if result.taken_at >= latest.taken_at:
+                latest = result
+            total += result.score
+            lowest = min(lowest, result.score)
+            highest = max(highest, result.score)
         
         progress_data = {
-            'first_test': sorted_results[0].score,
-            'latest_test': sorted_results[-1].score,
-            'improvement': sorted_results[-1].score - sorted_results[0].score,
-            'average_score': sum(r.score for r in sorted_results) / len(sorted_results),
-            'test_count': len(sorted_results),
-            'trend': 'improving' if sorted_results[-1].score > sorted_results[0].score else 'stable' if sorted_results[-1].score == sorted_results[0].score else 'declining'
+            'first_test': first.score,
+            'latest_test': latest.score,
+            'improvement': latest.score - first.score,
+            'average_score': total / len(previous_results),
+            'test_count': len(previous_results),
+            'min_score': lowest,
+            'max_score': highest,
+            'trend': 'improving' if latest.score > first.score else 'stable' if latest.score == first.score else 'declining'
         }
         
         return progress_data
 
-analyzer = TestAnalyzer()
\ No newline at end of file
+analyzer = TestAnalyzer()
+
+def benchmark(sizes=(10, 100, 1000), runs=2000, seed=0):
+    """Time analyze_results() on synthetic tests of each size.
+    
+    Returns {size: microseconds per analysis}; the per-answer cost should
+    stay flat as tests get longer.
+    """
+    rng = random.Random(seed)
+    question_types = list(analyzer.type_domains) + ['unmapped_type']
+    categories = ['Pattern Recognition', 'Logical Reasoning', 'Spatial Reasoning', 'Verbal Reasoning']
+    timings = {}
+    for size in sizes:
+        questions = [{'type': rng.choice(question_types), 'correct_answer': 'A'} for _ in range(size)]
+        answers = [{'category': rng.choice(categories), 'answer': rng.choice('AB')} for _ in range(size)]
+        repeats = max(1, runs * 10 // size)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            analyzer.analyze_results(answers, questions)
+        timings[size] = (time.perf_counter() - started) / repeats * 1e6
+    return timings
+
+def benchmark_cohort(attempts=5000, answers=10, seed=0):
+    """Time analyze_cohort() against one analyze_results() call per attempt.
+    
+    Returns the best of three (scalar, cohort, columnar) timings in seconds
+    for the same synthetic cohort; columnar is None without NumPy.
+    """
+    rng = random.Random(seed)
+    question_types = list(analyzer.type_domains) + ['unmapped_type']
+    categories = ['Pattern Recognition', 'Logical Reasoning', 'Spatial Reasoning', 'Verbal Reasoning']
+    cohort = []
+    for attempt_id in range(attempts):
+        questions = [{'type': rng.choice(question_types), 'correct_answer': 'A'} for _ in range(answers)]
+        attempt_answers = [{'category': rng.choice(categories), 'answer': rng.choice('AB')} for _ in range(answers)]
+        cohort.append((attempt_id, attempt_answers, questions))
+    columns = analyzer.cohort_columns(cohort)
+    
+    scalar_seconds = cohort_seconds = float('inf')
+    columnar_seconds = None if np is None else float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        for _, attempt_answers, questions in cohort:
+            analyzer.analyze_results(attempt_answers, questions)
+        scalar_seconds = min(scalar_seconds, time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        analyzer.analyze_cohort(*columns)
+        cohort_seconds = min(cohort_seconds, time.perf_counter() - started)
+        
+        if np is not None:
+            started = time.perf_counter()
+            analyzer.analyze_cohort(*columns, columnar=True)
+            columnar_seconds = min(columnar_seconds, time.perf_counter() - started)
+    return scalar_seconds, cohort_seconds, columnar_seconds
+
+if __name__ == '__main__':
+    for size, micros in benchmark().items():
+        print(f"{size:>6} answers: {micros:10.1f} us per analysis, {micros / size:.2f} us per answer")
+    
+    scalar_seconds, cohort_seconds, columnar_seconds = benchmark_cohort()
+    print(f"Cohort of 5000 attempts: {scalar_seconds * 1000:.1f} ms one by one, "
+          f"{cohort_seconds * 1000:.1f} ms with analyze_cohort ({'numpy' if np is not None else 'scalar fallback'})")
+    if columnar_seconds is not None:
+        print(f"Columnar arrays only: {columnar_seconds * 1000:.1f} ms")
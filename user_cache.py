@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+class CachedUser(UserMixin):
+    """Lightweight stand-in for a User row, enough for current_user in views and templates"""
+
+    def __init__(self, id, username, email):
+        self.id = id
+        self.username = username
+        self.email = email
+
+    def __repr__(self):
+        return f"<CachedUser {self.id} {self.username}>"
+
+class UserCache:
+    """Per-process TTL/LRU cache of CachedUser records for Flask-Login's user_loader.
+
+    Entries expire `ttl` seconds after they are loaded, so a change made by
+    another worker is seen within that time; changes made in this process
+    call invalidate() once they are committed. A record loaded while an
+    invalidation happened is returned but not cached, since it may predate
+    the change. Every hit is a User query saved.
+    """
+
+    def __init__(self, ttl=60, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._generation = 0
+
+    def get(self, user_id, load):
+        """Return the cached record for `user_id`, calling load(user_id) on a miss.
+
+        `load` returns a CachedUser or None; None (no such user) is not cached.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        user = load(user_id)
+        if user is None:
+            return None
+        with self._lock:
+            if generation != self._generation:
+                return user
+            self._entries[user_id] = (now + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        """Hit rate and User queries saved, for /health"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'queries_saved': self.hits,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions
+            }